@@ -9,6 +9,8 @@ import datetime
 from zipfile import ZipFile
 import json
 
+from .workspace import DiskBudgetExceeded
+
 def unzip_download(zippedfile):
     """ Unzips downloaded data from EarthExplorer.
 
@@ -23,24 +25,30 @@ def unzip_download(zippedfile):
     os.remove(zippedfile)
     return os.path.abspath(outdir)
 
-def download_zip(session, url):
+def download_zip(session, url, outdir="../data/", chunk_size=8 * 1024 * 1024):
     """ Downloads zipped data from EarthExplorer when provided with
-            the URL returning the output name.
+            the URL returning the output name. Data are streamed to a
+            partial file which is only renamed once complete.
 
         URL - EarthExplorer supplied URL to download data.
+        OUTDIR - Directory the data are saved to (e.g., a workspace's
+            downloads stage)
+        CHUNK SIZE - Bytes written at a time
     """
     response = session.get(url, stream=True)
+    response.raise_for_status()
     headers = response.headers['content-disposition']
     filename = re.findall("filename=(.+)", headers)[0].replace('"','')
     print("Your files are: {}".format(filename))
-    outdir = "../data/"
     print("Your data are being saved to: {}".format(os.path.abspath(outdir)))
     if not os.path.exists(outdir):
         os.makedirs(outdir)
-    outname = outdir + filename
+    outname = os.path.join(outdir, filename).replace('\\', '/')
     print("Downloading: {}".format(filename))
-    with open(outname, "wb") as dst:
-        dst.write(response.content)
+    with open(outname + ".part", "wb") as dst:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            dst.write(chunk)
+    os.replace(outname + ".part", outname)
     return outname
 
 def retrieve_download(session, label):
@@ -103,6 +111,21 @@ def request_download(session, entity_id, dataset_id, attempts=0):
             raise e
     return label, download_id
 
+def get_download_options(session, dataset_name, entity_id):
+    """ Queries the "download-options" API endpoint for an Entity ID,
+            returning its first download option, which includes the
+            Product ID and the file size in bytes.
+
+        See GET PRODUCT ID.
+    """
+    data = {'datasetName': dataset_name, 'entityIds': entity_id}
+    url = "https://m2m.cr.usgs.gov/api/api/json/stable/download-options"
+    request = session.post(url=url, data=json.dumps(data))
+    rd = request.json()['data'][0]
+    print(f"Your response looks like {rd}\n")
+    print("Your data are {} bytes in size!".format(rd['filesize']))
+    return rd
+
 def get_product_id(session, dataset_name, entity_id):
     """ Creates a Product ID, or Dataset ID, by querying against the
             "download-options" API endpoint using the Dataset Name,
@@ -115,35 +138,49 @@ def get_product_id(session, dataset_name, entity_id):
         ENTITY ID - Dataset Entity ID which can be retrieved by querying
             against the "scene-search" API endpoint.
     """
-    data = {'datasetName': dataset_name, 'entityIds': entity_id}
-    url = "https://m2m.cr.usgs.gov/api/api/json/stable/download-options"
-    request = session.post(url=url, data=json.dumps(data))
-    rd = request.json()['data'][0]
-    print(f"Your response looks like {rd}\n")
-    print("Your data are {} bytes in size!".format(rd['filesize']))
-    return rd['id']
+    return get_download_options(session, dataset_name, entity_id)['id']
 
-def download_imagery(session, datasetName, entity_id, max_retries=5):
+def download_imagery(session, datasetName, entity_id, max_retries=5, workspace=None):
     """ Wrapper function which generates an EarthExplorer product ID,
             requests the download, retrieves the download URL, downloads
             the zip file locally, and then unzips it locally.
 
-        Is dependent on the GET PRODUCT ID, REQUEST DOWNLOAD, RETRIEVE
+        Is dependent on the GET DOWNLOAD OPTIONS, REQUEST DOWNLOAD, RETRIEVE
             DOWNLOAD, DOWNLOAD ZIP, and UNZIP DOWNLOAD functions.
 
         DATASETNAME - Dataset Name which can be retrieved by querying
             against the "dataset-search" API endpoint.
         ENTITY ID - Dataset Entity ID which can be retrieved by querying
             against the "scene-search" API endpoint.
+        WORKSPACE - A job's Workspace. Data are downloaded into its
+            downloads stage, which must first reserve room for both the
+            zip file and its unzipped contents, raising DiskBudgetExceeded
+            otherwise. Downloads completed by a resumed workspace are reused.
     """
+    if workspace is not None and workspace.completed(entity_id):
+        print(f"Reusing {entity_id}, previously downloaded to: {workspace.completed(entity_id)}")
+        return workspace.completed(entity_id)
+
+    outdir = workspace.stage('downloads') if workspace is not None else "../data/"
+    filesize = None
     for attempt in range(max_retries):
         try:
-            dataset_id = get_product_id(session, datasetName, entity_id)
+            rd = get_download_options(session, datasetName, entity_id)
+            dataset_id = rd['id']
+            if workspace is not None and filesize is None:
+                filesize = int(rd['filesize'])
+                workspace.reserve('downloads', 2 * filesize)
             label, download_id = request_download(session, entity_id, dataset_id)
             if download_id != 999999999:
                 ready_download_ids = retrieve_download(session, label)
-                zippedfile = download_zip(session, download_id)
-                return unzip_download(zippedfile)
+                zippedfile = download_zip(session, download_id, outdir=outdir)
+                unzipped_dir = unzip_download(zippedfile)
+                if workspace is not None:
+                    workspace.release('downloads', filesize)  # The zip file is removed once unzipped
+                    workspace.complete(entity_id, unzipped_dir)
+                return unzipped_dir
+        except DiskBudgetExceeded:
+            raise
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {e}")
             print("\tFailure could have been due to staging\n")
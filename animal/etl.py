@@ -0,0 +1,155 @@
+"""
+SQL maintaining the ETL table, a materialization of the imagery repository tables
+(EarthExplorer, GEOINTDiscovery, and MaxarGeospatialPlatform), by precedence: a
+catalog id in EarthExplorer is not taken from GEOINTDiscovery, and one in either is
+not taken from MaxarGeospatialPlatform.
+
+The view ETL_SOURCE defines what the ETL table should contain. Triggers on the
+repository tables refresh only the catalog ids a change touches, inserting, updating,
+and deleting ETL rows to match ETL_SOURCE while keeping their sea state and
+shareability. Only SQL is built here, without Django, so dev_tools can share it.
+
+    Functions:
+        etl_triggers(log): Returns the CREATE TRIGGER statements maintaining the ETL table.
+        refresh_statements(key): Returns the statements refreshing the ETL rows of a catalog id.
+"""
+
+# Columns the ETL table takes from its sources
+ETL_COLUMNS = ['table_name', 'aoi_id', 'id', 'vendor_id', 'entity_id', 'vendor', 'platform',
+               'pixel_size_x', 'pixel_size_y', 'date', 'publish_date', 'geometry']
+
+# Columns only ever set on the ETL table, kept through refreshes and rebuilds
+ETL_ANNOTATIONS = ['sea_state_qual', 'sea_state_quant', 'shareable']
+
+ETL_SOURCE_VIEW = """
+    CREATE VIEW etl_source AS
+        SELECT 'EE' AS table_name,
+               e.aoi_id_id AS aoi_id,
+               e.catalog_id AS id,
+               e.vendor_id AS vendor_id,
+               e.entity_id AS entity_id,
+               e.vendor AS vendor,
+               e.satellite AS platform,
+               e.pixel_size_x AS pixel_size_x,
+               e.pixel_size_y AS pixel_size_y,
+               e.acquisition_date AS date,
+               Date(e.publish_date) AS publish_date,
+               AsText(e.bounds) AS geometry
+           FROM animal_earthexplorer e
+
+        UNION ALL
+
+        SELECT 'GEGD' AS table_name,
+               g.aoi_id_id AS aoi_id,
+               g.legacy_id AS id,
+               NULL AS vendor_id,
+               NULL AS entity_id,
+               g.company_name AS vendor,
+               g.source AS platform,
+               g.per_pixel_x AS pixel_size_x,
+               g.per_pixel_y AS pixel_size_y,
+               Date(g.acquisition_date) AS date,
+               NULL AS publish_date,
+               AsText(g.geometry) AS geometry
+           FROM animal_geointdiscovery g
+            WHERE NOT EXISTS (SELECT 1 FROM animal_earthexplorer e WHERE e.catalog_id = g.legacy_id)
+
+        UNION ALL
+
+        SELECT 'MGP' AS table_name,
+               m.aoi_id_id AS aoi_id,
+               m.id AS id,
+               NULL AS vendor_id,
+               NULL AS entity_id,
+               'Maxar' AS vendor,
+               m.platform AS platform,
+               m.gsd AS pixel_size_x,
+               m.gsd AS pixel_size_y,
+               Date(m.datetime) AS date,
+               NULL AS publish_date,
+               AsText(m.bbox) AS geometry
+           FROM animal_maxargeospatialplatform m
+            WHERE NOT EXISTS (SELECT 1 FROM animal_earthexplorer e WHERE e.catalog_id = m.id)
+            AND NOT EXISTS (SELECT 1 FROM animal_geointdiscovery g WHERE g.legacy_id = m.id)
+"""
+
+# Indexes on the catalog ids refreshes look rows up by
+ETL_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS etl_id_idx ON etl (id)",
+    "CREATE INDEX IF NOT EXISTS animal_earthexplorer_catalog_id_idx ON animal_earthexplorer (catalog_id)",
+    "CREATE INDEX IF NOT EXISTS animal_geointdiscovery_legacy_id_idx ON animal_geointdiscovery (legacy_id)",
+]
+
+# Source tables, their abbreviation, and the column holding their catalog id
+ETL_SOURCES = [
+    ('animal_earthexplorer', 'ee', 'catalog_id'),
+    ('animal_geointdiscovery', 'gegd', 'legacy_id'),
+    ('animal_maxargeospatialplatform', 'mgp', 'id'),
+]
+
+# Insert only triggers the ETL maintenance triggers replace
+LEGACY_TRIGGERS = ['update_etl_after_ee_insert', 'update_etl_after_gegd_insert', 'update_etl_after_mgp_insert']
+
+# An ETL row and a source row are the same image when their catalog and entity ids match
+SAME_IMAGE = "{a}.id = {b}.id AND IFNULL({a}.entity_id, '') = IFNULL({b}.entity_id, '')"
+
+def refresh_statements(key):
+    """ Returns the statements making the ETL rows of one catalog id match
+            ETL_SOURCE. Images new to the ETL are inserted, taking the sea
+            state and shareability of any image of the same catalog id they
+            supersede, images no longer in ETL_SOURCE are deleted, and the
+            rest are updated in place.
+
+        KEY - SQL expression of the catalog id (e.g., NEW.catalog_id, or a
+            query parameter)
+    """
+    columns = ', '.join(ETL_COLUMNS)
+    annotations = ', '.join(ETL_ANNOTATIONS)
+    carried = ', '.join(f"(SELECT p.{column} FROM etl p WHERE p.id = s.id AND p.{column} IS NOT NULL LIMIT 1)"
+                        for column in ETL_ANNOTATIONS)
+    sources = ', '.join(f"s.{column}" for column in ETL_COLUMNS)
+
+    return [
+        f"""INSERT INTO etl ({columns}, {annotations})
+            SELECT {sources}, {carried}
+            FROM etl_source s
+            WHERE s.id = {key}
+            AND NOT EXISTS (SELECT 1 FROM etl e WHERE {SAME_IMAGE.format(a='e', b='s')})""",
+        f"""DELETE FROM etl
+            WHERE id = {key}
+            AND NOT EXISTS (SELECT 1 FROM etl_source s WHERE {SAME_IMAGE.format(a='s', b='etl')})""",
+        f"""UPDATE etl SET ({columns}) = (
+                SELECT {sources} FROM etl_source s WHERE {SAME_IMAGE.format(a='s', b='etl')} LIMIT 1)
+            WHERE id = {key}
+            AND NOT EXISTS (
+                SELECT 1 FROM etl_source s WHERE {SAME_IMAGE.format(a='s', b='etl')}
+                AND ({', '.join(f's.{column}' for column in ETL_COLUMNS)})
+                    IS ({', '.join(f'etl.{column}' for column in ETL_COLUMNS)}))""",
+    ]
+
+def etl_triggers(log=True):
+    """ Returns the CREATE TRIGGER statements, keyed by trigger name, that
+            refresh the ETL after every insert, update, and delete on its
+            source tables. An update refreshes both the old and new
+            catalog id, in case it changed.
+
+        LOG - Record each firing in TRIGGER_LOG, as the earlier ETL triggers did
+    """
+    triggers = {}
+    for table, abbreviation, key in ETL_SOURCES:
+        for action, rows in (('INSERT', ['NEW']), ('UPDATE', ['OLD', 'NEW']), ('DELETE', ['OLD'])):
+            name = f"etl_after_{abbreviation}_{action.lower()}"
+            statements = [statement for row in rows for statement in refresh_statements(f"{row}.{key}")]
+            if log:
+                statements.append(f"""INSERT INTO trigger_log (trigger_name, action, log_message)
+                    VALUES ('{name}', '{action}', 'trigger fired after {action} on {table}')""")
+
+            body = ';\n'.join(statements)
+            triggers[name] = f"""
+                CREATE TRIGGER IF NOT EXISTS {name}
+                    AFTER {action} ON {table}
+                        BEGIN
+                            {body};
+                        END;
+            """
+    return triggers
@@ -97,15 +97,17 @@ class ProcessingForm(forms.Form):
         entity_id (CharField): Optional entity ID field
         vendor (ChoiceField): Optional dropdown of distinct vendor names
         platform (ChoiceField): Optional dropdown of distinct platform names
-        pixel_x_min (FloatField): Optional minimum x coordinate
-        pixel_x_max (FloatField): Optional maximum x coordinate  
-        pixel_y_min (FloatField): Optional minimum y coordinate
-        pixel_y_max (FloatField): Optional maximum y coordinate
+        pixel_x_min (FloatField): Optional minimum pixel width in ground units
+        pixel_x_max (FloatField): Optional maximum pixel width in ground units
+        pixel_y_min (FloatField): Optional minimum pixel height in ground units
+        pixel_y_max (FloatField): Optional maximum pixel height in ground units
         date_min (DateField): Optional start date with year selection (2007-2033)
         date_max (DateField): Optional end date defaulting to current date
         publish_date_min (DateField): Optional publish start date
         publish_date_max (DateField): Optional publish end date defaulting to current date
         aoi (ModelChoiceField): Optional area of interest selection
+        predicate (ChoiceField): Spatial relation of image footprints to the area of interest
+        page (IntegerField): Hidden results page number
 
     Meta:
         model: ExtractTransformLoad
@@ -119,10 +121,10 @@ class ProcessingForm(forms.Form):
                                required=False)
     platform = forms.ChoiceField(choices=[(platform, platform) for platform in ExtractTransformLoad.objects.values_list('platform', flat=True).distinct()],
                                  required=False)
-    pixel_x_min = forms.FloatField(required=False)
-    pixel_x_max = forms.FloatField(required=False)
-    pixel_y_min = forms.FloatField(required=False)
-    pixel_y_max = forms.FloatField(required=False)
+    pixel_x_min = forms.FloatField(required=False, min_value=0, label="Minimum pixel width")
+    pixel_x_max = forms.FloatField(required=False, min_value=0, label="Maximum pixel width")
+    pixel_y_min = forms.FloatField(required=False, min_value=0, label="Minimum pixel height")
+    pixel_y_max = forms.FloatField(required=False, min_value=0, label="Maximum pixel height")
     date_min = forms.DateField(required=False,
                                widget=forms.SelectDateWidget(years=range(2007, 2034)))
     date_max = forms.DateField(required=False,
@@ -134,12 +136,19 @@ class ProcessingForm(forms.Form):
                                        widget=forms.SelectDateWidget(years=range(2007, 2034)),
                                        initial = datetime.now())
     aoi = forms.ModelChoiceField(required=False, queryset=AreaOfInterest.objects.all())
+    predicate = forms.ChoiceField(choices=[('intersects', 'Intersects'),
+                                           ('within', 'Within'),
+                                           ('contains', 'Contains')],
+                                  initial='intersects',
+                                  label="Footprint relation to AOI")
+    page = forms.IntegerField(required=False, min_value=1, initial=1, widget=forms.HiddenInput())
 
     class Meta:
         model = ExtractTransformLoad
         fields = ['table_name', 'id', 'vendor_id', 'entity_id', 'vendor', 'platform',
                   'pixel_x_min', 'pixel_x_max', 'pixel_y_min', 'pixel_y_max',
-                  'date_min', 'date_max', 'publish_date_min', 'publish_date_max', 'aoi']
+                  'date_min', 'date_max', 'publish_date_min', 'publish_date_max', 'aoi',
+                  'predicate', 'page']
 
 class USWDSButtonGroupWidget(forms.Widget):
     def __init__(self, choices, attrs=None):
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+from time import time
+from django.core.management.base import BaseCommand, CommandError
+from utils.raster_ops import COG_PROFILES, cog_profile, write_cog, simulate_range_reads
+
+class Command(BaseCommand):
+    help = ("Benchmarks COG profiles against a sample scene, reporting file size, creation time, "
+            "and simulated range-read bytes per annotation viewport.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input-file',
+                            type=str,
+                            required=True,
+                            help="Sample scene (e.g., a pansharpened GeoTIFF or VRT)")
+        parser.add_argument('--profiles',
+                            nargs='+',
+                            default=list(COG_PROFILES),
+                            help=f"Profiles to benchmark (Default: {' '.join(COG_PROFILES)})")
+        parser.add_argument('--blocksize',
+                            type=int,
+                            nargs='+',
+                            default=[512],
+                            help="Block sizes to benchmark each profile with (Default: 512)")
+        parser.add_argument('--overview-count',
+                            type=int,
+                            default=None,
+                            help="Number of overview levels (Default: GDAL's choice)")
+        parser.add_argument('--viewport',
+                            type=int,
+                            nargs=2,
+                            default=[1024, 768],
+                            help="Viewport width and height in pixels (Default: 1024 768)")
+        parser.add_argument('--samples',
+                            type=int,
+                            default=50,
+                            help="Viewports sampled per profile (Default: 50)")
+        parser.add_argument('--level',
+                            type=int,
+                            default=0,
+                            help="Overview level the viewports are read from (Default: 0, full resolution)")
+        parser.add_argument('--output-dir',
+                            type=str,
+                            default=None,
+                            help="Keep benchmarked COGs in this directory (Default: a removed temporary directory)")
+
+    def handle(self, *args, **options):
+        input_file = options['input_file']
+        if not os.path.exists(input_file):
+            raise CommandError(f"Input file {input_file} does not exist")
+
+        unknown = [profile for profile in options['profiles'] if profile not in COG_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown COG profile(s): {', '.join(unknown)}")
+
+        output_dir = options['output_dir'] or tempfile.mkdtemp()
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.stdout.write(self.style.SUCCESS(f"Benchmarking {len(options['profiles'])} COG profile(s) against {input_file}"))
+        header = f"{'profile':<18}{'block':>7}{'size (MB)':>12}{'create (s)':>12}{'KB/viewport':>14}{'requests':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        try:
+            for profile in options['profiles']:
+                for blocksize in options['blocksize']:
+                    cog = os.path.join(output_dir, f"{profile}_{blocksize}_cog.tif")
+                    creation_options = cog_profile(profile, BLOCKSIZE=blocksize,
+                                                   OVERVIEW_COUNT=options['overview_count'])
+
+                    start = time()
+                    ds = write_cog(input_file, cog, **creation_options)
+                    elapsed = time() - start
+                    ds = None
+
+                    reads = simulate_range_reads(cog,
+                                                 viewport=tuple(options['viewport']),
+                                                 samples=options['samples'],
+                                                 level=options['level'])
+
+                    self.stdout.write(f"{profile:<18}{blocksize:>7}"
+                                      f"{os.path.getsize(cog) / 1024 ** 2:>12.1f}"
+                                      f"{elapsed:>12.1f}"
+                                      f"{reads['bytes_per_viewport'] / 1024:>14.1f}"
+                                      f"{reads['requests_per_viewport']:>10.1f}")
+        finally:
+            if not options['output_dir']:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark completed"))
@@ -0,0 +1,150 @@
+import os
+from glob import glob
+from time import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import shapely
+from django.db import connections, transaction
+from django.contrib.gis.geos import GEOSGeometry
+from django.core.management.base import BaseCommand, CommandError
+from animal.models import Fishnet, Project
+from utils.spatial_ops import fishnet_cells
+
+def build_cells(cog, fishnet_options):
+    """ Builds one COG's fishnet in a worker process, returning its cells as WKB. """
+    cells, crs = fishnet_cells(cog, **fishnet_options)
+    return os.path.basename(cog).replace('.tif', ''), shapely.to_wkb(cells).tolist()
+
+class Command(BaseCommand):
+    help = ("Builds fishnets for many COGs across a process pool and bulk inserts their cells, "
+            "assigned to a project, into the database. COGs already built for the project are "
+            "skipped, or rebuilt with --replace.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths',
+                            nargs='+',
+                            help="COGs, or directories searched recursively for COGs")
+        parser.add_argument('--project',
+                            type=int,
+                            default=None,
+                            help="Project ID the cells are assigned to")
+        parser.add_argument('--cell-width',
+                            type=float,
+                            default=600,
+                            help="Cell width in meters (Default: 600)")
+        parser.add_argument('--cell-height',
+                            type=float,
+                            default=400,
+                            help="Cell height in meters, rectangles only; hexagons are sized by --cell-width (Default: 400)")
+        parser.add_argument('--sizing',
+                            type=str,
+                            choices=['fixed', 'cog'],
+                            default='fixed',
+                            help="Cell sizing: fixed uses --cell-width and --cell-height; cog sizes cells to "
+                                 "--viewport from the COG's pixel size (Default: fixed)")
+        parser.add_argument('--viewport',
+                            type=int,
+                            nargs=2,
+                            default=[1024, 768],
+                            help="On-screen pixel budget, width and height, for adaptive sizing. It is floored to "
+                                 "whole COG tiles, so 1024 768 over 512 pixel tiles gives 1024 by 512 pixel cells "
+                                 "(Default: 1024 768)")
+        parser.add_argument('--buffer-overlap',
+                            type=float,
+                            default=0,
+                            help="Meters the footprint's bounds are buffered by (Default: 0)")
+        parser.add_argument('--shape',
+                            type=str,
+                            choices=['rectangle', 'hex'],
+                            default='rectangle',
+                            help="Cell shape (Default: rectangle)")
+        parser.add_argument('--mask',
+                            type=str,
+                            choices=['valid', 'water', 'none'],
+                            default='valid',
+                            help="Skip cells without valid, or water, pixels (Default: valid)")
+        parser.add_argument('--replace',
+                            action='store_true',
+                            help="Rebuild the fishnets of COGs already built for the project, deleting their "
+                                 "cells and reviews, opposed to skipping them")
+        parser.add_argument('--workers',
+                            type=int,
+                            default=os.cpu_count(),
+                            help="Worker processes building fishnets (Default: CPU count)")
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=2000,
+                            help="Cells inserted per query (Default: 2000)")
+
+    def find_cogs(self, paths):
+        cogs = []
+        for path in paths:
+            if os.path.isdir(path):
+                cogs += glob(os.path.join(path, '**', '*.tif'), recursive=True)
+            elif os.path.exists(path):
+                cogs.append(path)
+            else:
+                raise CommandError(f"{path} does not exist")
+        return sorted(cog.replace('\\', '/') for cog in cogs)
+
+    def handle(self, *args, **options):
+        project = None
+        if options['project'] is not None:
+            try:
+                project = Project.objects.get(id=options['project'])
+            except Project.DoesNotExist:
+                raise CommandError(f"Project {options['project']} does not exist")
+
+        cogs = self.find_cogs(options['paths'])
+        if not cogs:
+            raise CommandError("No COGs found")
+
+        # COGs whose fishnet was already built for the project
+        built = set(Fishnet.objects.filter(project=project,
+                                           vendor_id__in=[os.path.basename(cog).replace('.tif', '') for cog in cogs])
+                                   .values_list('vendor_id', flat=True).distinct())
+        if built and not options['replace']:
+            cogs = [cog for cog in cogs if os.path.basename(cog).replace('.tif', '') not in built]
+            self.stdout.write(f"Skipping {len(built)} COGs with fishnets already built (rebuild them with --replace)")
+        self.stdout.write(self.style.SUCCESS(f"Building fishnets for {len(cogs)} COGs"))
+
+        # Workers never touch the database; close this process's connection before forking
+        connections.close_all()
+
+        fishnet_options = {
+            'cell_width': options['cell_width'],
+            'cell_height': options['cell_height'],
+            'buffer_overlap': options['buffer_overlap'],
+            'shape': options['shape'],
+            'mask': None if options['mask'] == 'none' else options['mask'],
+            'viewport': tuple(options['viewport']) if options['sizing'] != 'fixed' else None,
+        }
+
+        start = time()
+        total, failed = 0, []
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(build_cells, cog, fishnet_options): cog for cog in cogs}
+            for future in as_completed(futures):
+                cog = futures[future]
+                try:
+                    vendor_id, cells = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Failed building the fishnet for {cog} with Exception: {e}")
+                    failed.append(cog)
+                    continue
+
+                # Cells keep the COG's coordinates, as the detection page expects
+                rows = [Fishnet(vendor_id=vendor_id, cell=GEOSGeometry(memoryview(cell)), project=project)
+                        for cell in cells]
+                with transaction.atomic():
+                    if vendor_id in built:
+                        Fishnet.objects.filter(vendor_id=vendor_id, project=project).delete()
+                    Fishnet.objects.bulk_create(rows, batch_size=options['batch_size'])
+                total += len(rows)
+                self.stdout.write(f"\tInserted {len(rows)} cells for {vendor_id}")
+
+        elapsed = time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {total} cells from {len(cogs) - len(failed)} COGs in {round(elapsed, 2)} seconds "
+            f"({round(total / max(elapsed, 1e-6))} cells/sec)"))
+        if failed:
+            self.stderr.write(f"Failed to build {len(failed)} fishnets: {failed}")
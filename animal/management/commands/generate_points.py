@@ -1,8 +1,11 @@
+import os
+import geopandas as gpd
 from django.core.management.base import BaseCommand
-from animal.views.views import generate_interesting_points_subprocess
+from utils.detection import METHODS, TILE_SIZE, WINDOW_SIZE, detect_interesting_points
+from animal.utils import write_poi_catalog
 
 class Command(BaseCommand):
-    help = "Runs the generate_interesting_points.py script as a subprocess."
+    help = "Detects interesting points in a GeoTIFF, in-process and tile by tile, writing a point catalog."
 
     def add_arguments(self, parser):
         parser.add_argument('--input-file',
@@ -10,25 +13,71 @@ class Command(BaseCommand):
                             help="GeoTIFF to be exploited")
         parser.add_argument('--output-file',
                             type=str,
-                            help="Output GeoJSON file")
+                            help="Output point catalog, its extension is set by --format")
         parser.add_argument('--method',
                             type=str,
+                            choices=METHODS,
                             default='big_window',
                             help="Method (Default: Big Window)")
         parser.add_argument('--difference',
-                            type=str,
-                            default='20',
+                            type=float,
+                            default=20,
                             help="Difference (Default: 20)")
+        parser.add_argument('--window',
+                            type=int,
+                            default=WINDOW_SIZE,
+                            help=f"Big window size in pixels (Default: {WINDOW_SIZE})")
+        parser.add_argument('--tile-size',
+                            type=int,
+                            default=TILE_SIZE,
+                            help=f"Tile size in pixels, rounded up to whole COG blocks (Default: {TILE_SIZE})")
+        parser.add_argument('--halo',
+                            type=int,
+                            default=None,
+                            help="Pixels read around each tile (Default: half the window)")
+        parser.add_argument('--sigma',
+                            type=float,
+                            default=None,
+                            help="Local standard deviations a point must also differ by (Default: unused)")
+        parser.add_argument('--mask',
+                            type=str,
+                            choices=['valid', 'water', 'none'],
+                            default='valid',
+                            help="Skip tiles without valid, or water, pixels (Default: valid)")
+        parser.add_argument('--workers',
+                            type=int,
+                            default=None,
+                            help="Worker processes, or 1 to search in-process (Default: CPU count)")
+        parser.add_argument('--format',
+                            type=str,
+                            choices=['parquet', 'geojson'],
+                            default='parquet',
+                            help="Point catalog format (Default: GeoParquet)")
+        parser.add_argument('--export-geojson',
+                            action='store_true',
+                            help="Also export a GeoParquet catalog as GeoJSON")
 
     def handle(self, *args, **options):
         input_file = options['input_file']
-        output_file = options['output_file']
+        output_file = os.path.splitext(options['output_file'])[0] + '.' + options['format']
         method = options['method']
         difference = options['difference']
         
-        self.stdout.write(self.style.SUCCESS(f"Starting the subprocess to generate interesting points..."))
+        self.stdout.write(self.style.SUCCESS(f"Starting to generate interesting points..."))
         self.stdout.write(self.style.SUCCESS(f"\trunning using file: {input_file}, output file: {output_file}"))
         
-        generate_interesting_points_subprocess(input_file, output_file, method, difference)
+        gdf = detect_interesting_points(input_file, method, difference,
+                                        window=options['window'],
+                                        tile_size=options['tile_size'],
+                                        halo=options['halo'],
+                                        sigma=options['sigma'],
+                                        mask=None if options['mask'] == 'none' else options['mask'],
+                                        max_workers=options['workers'])
+        write_poi_catalog(gdf, output_file)
+        self.stdout.write(self.style.SUCCESS(f"\tfound {len(gdf)} interesting points"))
+
+        if options['export_geojson'] and options['format'] == 'parquet':
+            geojson = write_poi_catalog(gpd.read_parquet(output_file), os.path.splitext(output_file)[0] + '.geojson')
+            self.stdout.write(self.style.SUCCESS(f"\texported GeoJSON: {geojson}"))
         
-        self.stdout.write(self.style.SUCCESS(f"Subprocess execution completed"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Point generation completed"))
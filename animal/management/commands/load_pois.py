@@ -0,0 +1,80 @@
+import os
+from glob import glob
+from time import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from animal.utils import read_poi_catalog, write_pois
+
+class Command(BaseCommand):
+    help = ("Loads interesting point catalogs (GeoJSON or GeoParquet) into the database. Catalogs are "
+            "read in parallel worker processes and written by this process alone, in batches, "
+            "respecting SQLite's single writer.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths',
+                            nargs='+',
+                            help="Catalogs, or directories searched recursively for catalogs")
+        parser.add_argument('--workers',
+                            type=int,
+                            default=os.cpu_count(),
+                            help="Worker processes reading catalogs (Default: CPU count)")
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=2000,
+                            help="Records written per query (Default: 2000)")
+
+    def find_catalogs(self, paths):
+        catalogs = []
+        for path in paths:
+            if os.path.isdir(path):
+                for extension in ('geojson', 'parquet'):
+                    catalogs += glob(os.path.join(path, '**', f'*.{extension}'), recursive=True)
+            elif os.path.exists(path):
+                catalogs.append(path)
+            else:
+                raise CommandError(f"{path} does not exist")
+        return sorted(catalog.replace('\\', '/') for catalog in catalogs)
+
+    def handle(self, *args, **options):
+        catalogs = self.find_catalogs(options['paths'])
+        if not catalogs:
+            raise CommandError("No GeoJSON or GeoParquet catalogs found")
+        self.stdout.write(self.style.SUCCESS(f"Found {len(catalogs)} catalogs to load into the database"))
+
+        # Workers never touch the database; close this process's connection before forking
+        connections.close_all()
+
+        start = time()
+        rows, created, updated, failed = 0, 0, 0, []
+        pending = iter(catalogs)
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            # Bound the catalogs held in memory while waiting on the writer
+            futures = {executor.submit(read_poi_catalog, catalog): catalog
+                       for catalog in (next(pending, None) for _ in range(2 * options['workers'])) if catalog}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    catalog = futures.pop(future)
+                    try:
+                        points = future.result()
+                        file_created, file_updated = write_pois(points, batch_size=options['batch_size'])
+                    except Exception as e:
+                        self.stderr.write(f"Failed loading {catalog} with Exception: {e}")
+                        failed.append(catalog)
+                    else:
+                        rows += len(points['sample_idx'])
+                        created += file_created
+                        updated += file_updated
+                        self.stdout.write(f"\tLoaded {len(points['sample_idx'])} points from {catalog}")
+
+                    following = next(pending, None)
+                    if following:
+                        futures[executor.submit(read_poi_catalog, following)] = following
+
+        elapsed = time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {rows} points ({created} created, {updated} updated) from {len(catalogs) - len(failed)} catalogs "
+            f"in {round(elapsed, 2)} seconds ({round(rows / max(elapsed, 1e-6))} rows/sec)"))
+        if failed:
+            self.stderr.write(f"Failed to load {len(failed)} catalogs: {failed}")
@@ -0,0 +1,97 @@
+from time import time
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+from animal.etl import ETL_ANNOTATIONS, ETL_COLUMNS, SAME_IMAGE, refresh_statements
+
+COLUMNS = ', '.join(ETL_COLUMNS)
+
+# Catalog ids whose ETL rows differ from ETL_SOURCE, compared in bulk in both directions
+DIFFERING_IDS = f"""
+    SELECT id FROM (SELECT {COLUMNS} FROM etl_source EXCEPT SELECT {COLUMNS} FROM etl)
+    UNION
+    SELECT id FROM (SELECT {COLUMNS} FROM etl EXCEPT SELECT {COLUMNS} FROM etl_source)
+"""
+
+DUPLICATE_IDS = """
+    SELECT DISTINCT id FROM etl GROUP BY id, IFNULL(entity_id, '') HAVING COUNT(*) > 1
+"""
+
+class Command(BaseCommand):
+    help = ("Verifies the ETL table against its sources, the etl_source view, reporting the catalog ids "
+            "that differ. Optionally repairs those ids, or rebuilds the whole table, keeping sea states "
+            "and shareability.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair',
+                            action='store_true',
+                            help="Refresh the ETL rows of every differing catalog id")
+        parser.add_argument('--rebuild',
+                            action='store_true',
+                            help="Rebuild the ETL table from etl_source in full")
+        parser.add_argument('--show',
+                            type=int,
+                            default=10,
+                            help="Differing catalog ids listed (Default: 10)")
+
+    def verify(self, cursor):
+        start = time()
+        cursor.execute(DIFFERING_IDS)
+        differing = [row[0] for row in cursor.fetchall()]
+        cursor.execute(DUPLICATE_IDS)
+        duplicates = [row[0] for row in cursor.fetchall()]
+        self.stdout.write(f"Found {len(differing)} differing and {len(duplicates)} duplicated catalog ids "
+                          f"in {round(time() - start, 2)} seconds")
+        return differing, duplicates
+
+    def repair(self, cursor, ids):
+        statements = refresh_statements('%s')
+        with transaction.atomic():
+            for statement in statements:
+                cursor.executemany(statement, [[id] for id in ids])
+
+    def rebuild(self, cursor):
+        annotations = ', '.join(ETL_ANNOTATIONS)
+        with transaction.atomic():
+            cursor.execute(f"""
+                CREATE TEMP TABLE etl_annotations AS
+                    SELECT id, entity_id, {', '.join(f'MAX({column}) AS {column}' for column in ETL_ANNOTATIONS)}
+                    FROM etl
+                    WHERE {' OR '.join(f'{column} IS NOT NULL' for column in ETL_ANNOTATIONS)}
+                    GROUP BY id, IFNULL(entity_id, '')
+            """)
+            cursor.execute("DELETE FROM etl")
+            cursor.execute(f"""
+                INSERT INTO etl ({COLUMNS}, {annotations})
+                SELECT {', '.join(f's.{column}' for column in ETL_COLUMNS)},
+                       {', '.join(f'a.{column}' for column in ETL_ANNOTATIONS)}
+                FROM etl_source s
+                LEFT JOIN temp.etl_annotations a ON {SAME_IMAGE.format(a='a', b='s')}
+            """)
+            cursor.execute("DROP TABLE temp.etl_annotations")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if options['rebuild']:
+                start = time()
+                self.rebuild(cursor)
+                cursor.execute("SELECT COUNT(*) FROM etl")
+                self.stdout.write(self.style.SUCCESS(
+                    f"Rebuilt the ETL table, {cursor.fetchone()[0]} rows, in {round(time() - start, 2)} seconds"))
+                return
+
+            differing, duplicates = self.verify(cursor)
+            if differing:
+                self.stdout.write(f"\tDiffering catalog ids: {differing[:options['show']]}")
+            if duplicates:
+                self.stdout.write(f"\tDuplicated catalog ids: {duplicates[:options['show']]} (run with --rebuild)")
+
+            if options['repair'] and differing:
+                start = time()
+                self.repair(cursor, differing)
+                self.stdout.write(f"Refreshed {len(differing)} catalog ids in {round(time() - start, 2)} seconds")
+                differing, duplicates = self.verify(cursor)
+
+            if differing or duplicates:
+                self.stderr.write(f"The ETL table differs from its sources for {len(differing) + len(duplicates)} catalog ids")
+            else:
+                self.stdout.write(self.style.SUCCESS("The ETL table matches its sources"))
@@ -0,0 +1,42 @@
+import logging
+from django.db import migrations
+
+logger = logging.getLogger('animal')
+
+SPATIAL_COLUMNS = [
+    ('animal_fishnet', 'cell'),
+    ('animal_pointsofinterest', 'point'),
+]
+
+
+def create_spatial_indexes(apps, schema_editor):
+    """ Ensures SpatiaLite R*Tree spatial indexes exist on fishnet cells and
+            interesting points. Databases built outside of these migrations
+            may have the geometry columns registered without an index.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table, column in SPATIAL_COLUMNS:
+            cursor.execute("""
+                SELECT spatial_index_enabled
+                FROM geometry_columns
+                WHERE f_table_name = %s AND f_geometry_column = %s
+            """, [table, column])
+            row = cursor.fetchone()
+            if row is None:
+                logger.warning(f"{table}.{column} is not a registered geometry column, skipping its spatial index")
+            elif row[0] == 0:
+                cursor.execute("SELECT CreateSpatialIndex(%s, %s)", [table, column])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0010_alter_classification_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_spatial_indexes, reverse_code=migrations.RunPython.noop),
+    ]
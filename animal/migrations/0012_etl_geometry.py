@@ -0,0 +1,86 @@
+import logging
+from django.db import migrations
+
+logger = logging.getLogger('animal')
+
+# Keep GEOM in step with the WKT in GEOMETRY for every way rows reach the ETL
+#      table, including the triggers on the repository tables
+ETL_GEOM_TRIGGERS = {
+    'etl_geom_after_insert': """
+        CREATE TRIGGER IF NOT EXISTS etl_geom_after_insert
+            AFTER INSERT ON etl
+                WHEN NEW.geometry IS NOT NULL
+                    BEGIN
+                        UPDATE etl SET geom = GeomFromText(NEW.geometry, 4326) WHERE ROWID = NEW.ROWID;
+                    END;
+    """,
+    'etl_geom_after_update': """
+        CREATE TRIGGER IF NOT EXISTS etl_geom_after_update
+            AFTER UPDATE OF geometry ON etl
+                    BEGIN
+                        UPDATE etl SET geom = GeomFromText(NEW.geometry, 4326) WHERE ROWID = NEW.ROWID;
+                    END;
+    """,
+}
+
+
+def etl_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'etl'")
+    return cursor.fetchone() is not None
+
+
+def add_etl_geometry(apps, schema_editor):
+    """ Adds a SpatiaLite geometry column, GEOM, to the unmanaged ETL table,
+            populates it from the WKT in GEOMETRY, and indexes it so AOI
+            filtering is a single indexed spatial query.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if not etl_exists(cursor):
+            logger.warning("etl does not exist, skipping its geometry column")
+            return
+
+        cursor.execute("""
+            SELECT spatial_index_enabled
+            FROM geometry_columns
+            WHERE f_table_name = 'etl' AND f_geometry_column = 'geom'
+        """)
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("SELECT AddGeometryColumn('etl', 'geom', 4326, 'GEOMETRY', 'XY')")
+
+        cursor.execute("""
+            UPDATE etl SET geom = GeomFromText(geometry, 4326)
+            WHERE geom IS NULL AND geometry IS NOT NULL
+        """)
+
+        if row is None or row[0] == 0:
+            cursor.execute("SELECT CreateSpatialIndex('etl', 'geom')")
+
+        for sql in ETL_GEOM_TRIGGERS.values():
+            cursor.execute(sql)
+
+
+def drop_etl_geometry_triggers(apps, schema_editor):
+    """ Drops the triggers maintaining GEOM. SQLite cannot drop the column
+            itself; it is left in place, unused.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for name in ETL_GEOM_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0011_spatial_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_etl_geometry, reverse_code=drop_etl_geometry_triggers),
+    ]
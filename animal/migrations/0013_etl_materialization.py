@@ -0,0 +1,58 @@
+import logging
+from django.db import migrations
+
+from animal.etl import ETL_INDEXES, ETL_SOURCE_VIEW, LEGACY_TRIGGERS, etl_triggers
+
+logger = logging.getLogger('animal')
+
+
+def table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [name])
+    return cursor.fetchone() is not None
+
+
+def maintain_etl(apps, schema_editor):
+    """ Replaces the ETL table's insert only triggers with ones refreshing it
+            on every insert, update, and delete of its source tables, as
+            defined by the ETL_SOURCE view. Run `python manage.py sync_etl`
+            afterwards to find, and repair, rows the earlier triggers missed.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if not table_exists(cursor, 'etl'):
+            logger.warning("etl does not exist, skipping its maintenance triggers")
+            return
+
+        for sql in ETL_INDEXES:
+            cursor.execute(sql)
+
+        cursor.execute("DROP VIEW IF EXISTS etl_source")
+        cursor.execute(ETL_SOURCE_VIEW)
+
+        for name in LEGACY_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for sql in etl_triggers(log=table_exists(cursor, 'trigger_log')).values():
+            cursor.execute(sql)
+
+
+def drop_etl_maintenance(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for name in etl_triggers():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute("DROP VIEW IF EXISTS etl_source")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0012_etl_geometry'),
+    ]
+
+    operations = [
+        migrations.RunPython(maintain_etl, reverse_code=drop_etl_maintenance),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+POINTS_EPSG_CODE_INDEX = "pointsofinterest_epsg_code_idx"
+
+
+def create_epsg_code_index(apps, schema_editor):
+    """ Indexes interesting points' EPSG codes, so the few distinct codes are
+            found by seeking the index, opposed to scanning every point.
+            Created with SQL, opposed to db_index, so SQLite does not
+            rebuild the SpatiaLite table.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {POINTS_EPSG_CODE_INDEX} ON animal_pointsofinterest (epsg_code)")
+
+
+def drop_epsg_code_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {POINTS_EPSG_CODE_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0013_etl_materialization'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_epsg_code_index, reverse_code=drop_epsg_code_index),
+    ]
@@ -307,13 +307,18 @@ class ExtractTransformLoad(gis_models.Model):
         pixel_size_y (FloatField): Pixel height in ground units
         date (DateField): Date of image capture
         publish_date (DateField): Date of image publication
-        geometry (TextField): Geometry information of the image footprint
+        geometry (TextField): Geometry information of the image footprint, as WKT
+        geom (GeometryField): The image footprint as a spatially indexed geometry, kept in step
+            with geometry by the etl_geom triggers
         sea_state_qual (CharField): Qualitative sea state description, optional, max length 15 characters
         sea_state_quant (IntegerField): Quantitative sea state measurement, optional
         shareable (CharField): Sharing permissions indicator, optional, max length 3 characters
 
     Note:
         The model has a unique constraint on the combination of id, vendor_id, and entity_id fields.
+        Rows are kept in step with the etl_source view by triggers on the EarthExplorer,
+        GEOINTDiscovery, and MaxarGeospatialPlatform tables (see animal.etl), and verified with
+        `python manage.py sync_etl`.
     """
     table_name = gis_models.CharField(max_length = 4)
     aoi_id = gis_models.IntegerField()
@@ -326,7 +331,8 @@ class ExtractTransformLoad(gis_models.Model):
     pixel_size_y = gis_models.FloatField()
     date = gis_models.DateField()
     publish_date = gis_models.DateField()
-    geometry = gis_models.TextField() # Might need to *rebuild* as Geometry type
+    geometry = gis_models.TextField()
+    geom = gis_models.GeometryField(srid = 4326, null = True, blank = True)
     sea_state_qual = gis_models.CharField(max_length = 15, null = True, blank = True)
     sea_state_quant = gis_models.IntegerField(null = True, blank = True)
     shareable = gis_models.CharField(max_length = 3, null = True, blank = True)
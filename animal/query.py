@@ -21,6 +21,15 @@ Functions:
               where: str, limit: int, export: str = None, bbox: list = None, geometry: dict = None) -> list:
         Performs spatio-temporal query against Maxar Geospatial Portal STAC API.
         Returns API response and list of catalog IDs matching query parameters.
+    points_epsg_codes() -> list:
+        Returns the EPSG codes interesting points are stored in.
+    points_in_cell(cell, cell_epsg: str = '3857', project_id: int = None, limit: int = 5000) -> list:
+        Returns the interesting points within a fishnet cell, using SpatiaLite's R*Tree spatial index.
+    etl_spatial_filter(queryset, geometry, predicate: str = 'intersects'):
+        Filters ETL records by their footprint's relation to a geometry.
+    search_etl(queryset, filters: dict, aoi=None, predicate: str = 'intersects', page: int = 1,
+               page_size: int = None, limit: int = None) -> tuple:
+        Filters, pages, and caps ETL records, with their footprints as GeoJSON.
 These functions make use of work found at: https://github.com/yannforget/landsatxplore
 """
 
@@ -29,6 +38,15 @@ import json
 import requests
 import pandas as pd
 from .security import mgp_login
+from pyproj import CRS, Transformer
+
+# Django stack
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.contrib.gis.geos import GEOSGeometry
 
 def geojson_for_ee(geojson:dict):
     """ Helper function to build the 'geoJson' value payload
@@ -250,4 +268,188 @@ def query_mgp(username, password, collections, start, end, where, limit, export=
     
     else:
         print(
-            f"Failed with status code {response.status_code} & error {response.text}")
\ No newline at end of file
+            f"Failed with status code {response.status_code} & error {response.text}")
+
+# Interesting points are stored in the coordinates of the imagery they were
+#      found in (the pansharpened image's UTM zone), labelled with the column's
+#      SRID, with their actual EPSG code in EPSG CODE. Points without one cannot
+#      be located and are never returned. Fishnet cells are in the COGs' Web
+#      Mercator coordinates.
+COG_EPSG = '3857'
+POINT_SRID = 4326
+
+# Image footprints in the ETL table's GEOM column
+ETL_SRID = 4326
+
+# Spatial predicates ETL footprints can be filtered by, relative to an AOI
+ETL_PREDICATES = {
+    'intersects': 'geom__intersects',
+    'within': 'geom__within',
+    'contains': 'geom__contains',
+}
+
+# ETL search form fields, and the lookups they filter by
+ETL_FILTERS = {
+    'table_name': 'table_name',
+    'id': 'id',
+    'vendor_id': 'vendor_id',
+    'entity_id': 'entity_id',
+    'vendor': 'vendor',
+    'platform': 'platform',
+    'pixel_x_min': 'pixel_size_x__gte',
+    'pixel_x_max': 'pixel_size_x__lte',
+    'pixel_y_min': 'pixel_size_y__gte',
+    'pixel_y_max': 'pixel_size_y__lte',
+    'date_min': 'date__gte',
+    'date_max': 'date__lte',
+    'publish_date_min': 'publish_date__gte',
+    'publish_date_max': 'publish_date__lte',
+}
+
+ETL_COLUMNS = ['id', 'vendor_id', 'entity_id', 'vendor', 'platform', 'date', 'publish_date',
+               'pixel_size_x', 'pixel_size_y']
+
+def points_epsg_codes():
+    """ Returns the EPSG codes interesting points are stored in, cached for
+            five minutes. The distinct codes are found by seeking the
+            epsg_code index once per code, opposed to scanning every point.
+    """
+    codes = cache.get('poi_epsg_codes')
+    if codes is None:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                WITH RECURSIVE codes(epsg_code) AS (
+                    SELECT MIN(epsg_code) FROM animal_pointsofinterest WHERE epsg_code > ''
+                    UNION ALL
+                    SELECT (SELECT MIN(p.epsg_code) FROM animal_pointsofinterest p WHERE p.epsg_code > codes.epsg_code)
+                    FROM codes WHERE codes.epsg_code IS NOT NULL
+                )
+                SELECT epsg_code FROM codes WHERE epsg_code IS NOT NULL
+            """)
+            codes = [str(row[0]) for row in cursor.fetchall()]
+        cache.set('poi_epsg_codes', codes, timeout=300)
+    return codes
+
+def points_in_cell(cell, cell_epsg=COG_EPSG, project_id=None, limit=5000):
+    """ Returns the interesting points within a fishnet cell as a bounded,
+            indexed query. For each EPSG code points are stored in, the
+            cell is transformed to that CRS, candidates are found from the
+            R*Tree with the cell's bounds, then refined to those within it.
+
+        CELL - Fishnet cell polygon (GEOS)
+        CELL EPSG - The EPSG code of the cell's coordinates (Default: 3857)
+        PROJECT ID - Only return points of this project, or of none (e.g.,
+            those imported from a catalog)
+        LIMIT - Maximum number of points returned
+
+        Returns a list of dictionaries of each point's id, vendor id, final
+            classification, longitude, and latitude.
+    """
+    points = []
+    for epsg_code in points_epsg_codes():
+        if len(points) >= limit:
+            break
+
+        # Cells are labelled with their column's SRID, so their actual EPSG code is set first
+        local = GEOSGeometry(cell.wkb, srid=int(cell_epsg)).transform(int(epsg_code), clone=True)
+        xmin, ymin, xmax, ymax = local.extent
+
+        sql = """
+            SELECT id, vendor_id, final_classification_id, X(point), Y(point)
+            FROM animal_pointsofinterest
+            WHERE ROWID IN (
+                SELECT ROWID FROM SpatialIndex
+                WHERE f_table_name = 'animal_pointsofinterest'
+                AND f_geometry_column = 'point'
+                AND search_frame = BuildMbr(%s, %s, %s, %s, %s)
+            )
+            AND Within(point, GeomFromWKB(%s, %s)) = 1
+        """
+        params = [xmin, ymin, xmax, ymax, POINT_SRID, bytes(local.wkb), POINT_SRID]
+
+        sql += " AND epsg_code = %s"
+        params.append(epsg_code)
+
+        if project_id is not None:
+            sql += " AND (project_id = %s OR project_id IS NULL)"
+            params.append(project_id)
+
+        sql += " LIMIT %s"
+        params.append(limit - len(points))
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        to_lonlat = Transformer.from_crs(CRS(f"EPSG:{epsg_code}"), CRS("EPSG:4326"), always_xy=True)
+        for id, vendor_id, classification_id, x, y in rows:
+            lon, lat = to_lonlat.transform(x, y)
+            points.append({'id': id, 'vendor_id': vendor_id, 'final_classification_id': classification_id,
+                           'longitude': lon, 'latitude': lat})
+
+    return points
+
+
+def etl_spatial_filter(queryset, geometry, predicate='intersects'):
+    """ Filters ETL records by their footprint's relation to a geometry, in the
+            database. Candidates are found from GEOM's R*Tree with the
+            geometry's bounds, then refined with the predicate, all within
+            the one query.
+
+        QUERYSET - ExtractTransformLoad queryset
+        GEOMETRY - GEOS geometry (e.g., an AreaOfInterest's)
+        PREDICATE - One of ETL_PREDICATES: footprints that intersect, are
+            within, or contain the geometry (Default: intersects)
+
+        Returns the filtered queryset.
+    """
+    if predicate not in ETL_PREDICATES:
+        raise ValueError(f"Unknown spatial predicate {predicate}. Choose from: {', '.join(ETL_PREDICATES)}")
+    if geometry.srid and geometry.srid != ETL_SRID:
+        geometry = geometry.transform(ETL_SRID, clone=True)
+
+    # Each predicate implies the footprint's bounds intersect the geometry's
+    xmin, ymin, xmax, ymax = geometry.extent
+    return queryset.filter(**{ETL_PREDICATES[predicate]: geometry}).extra(
+        where=["""
+            "etl".ROWID IN (
+                SELECT ROWID FROM SpatialIndex
+                WHERE f_table_name = 'etl'
+                AND f_geometry_column = 'geom'
+                AND search_frame = BuildMbr(%s, %s, %s, %s, %s)
+            )
+        """],
+        params=[xmin, ymin, xmax, ymax, ETL_SRID])
+
+def search_etl(queryset, filters, aoi=None, predicate='intersects', page=1, page_size=None, limit=None):
+    """ ETL search, evaluated entirely in the database: attribute and range
+            filters, a spatial predicate on the AOI, footprints as GeoJSON
+            from AsGeoJSON, and one page of at most LIMIT results.
+
+        QUERYSET - ExtractTransformLoad queryset
+        FILTERS - Search form values keyed by the fields of ETL_FILTERS;
+            empty values are ignored
+        AOI - Optionally, a GEOS geometry footprints must relate to
+        PREDICATE - One of ETL_PREDICATES (Default: intersects)
+        PAGE - Page number, clamped to the pages available
+        PAGE SIZE - Results per page (Default: settings.ETL_SEARCH_PAGE_SIZE)
+        LIMIT - Results searched are capped at (Default: settings.ETL_SEARCH_LIMIT)
+
+        Returns a Paginator Page of dictionaries of ETL_COLUMNS and the
+            footprint's GeoJSON, and whether the results were capped.
+    """
+    page_size = page_size or getattr(settings, 'ETL_SEARCH_PAGE_SIZE', 100)
+    limit = limit or getattr(settings, 'ETL_SEARCH_LIMIT', 1000)
+
+    queryset = queryset.filter(**{lookup: filters[field] for field, lookup in ETL_FILTERS.items()
+                                  if filters.get(field) not in (None, '')})
+    if aoi is not None:
+        queryset = etl_spatial_filter(queryset, aoi, predicate)
+
+    results = (queryset.annotate(geojson=AsGeoJSON('geom', precision=6))
+                       .order_by('-date', 'id')
+                       .values(*ETL_COLUMNS, 'geojson')[:limit])
+    paginator = Paginator(results, page_size)
+    capped = paginator.count == limit and queryset[limit:limit + 1].exists()
+
+    return paginator.get_page(page), capped
@@ -8,6 +8,8 @@ them individually.
 Functions:
     process_etl_data(filtered_data_ids): Process multiple ETL records
     process_data(etl): Process a single ETL record
+    process_pair(session, pair): Download and preprocess one PAN, MSI pair
+    process_imagery(auth_token, pairs): Preprocess PAN, MSI pairs off the request
 
 Args:
     filtered_data_ids (list): List of ExtractTransformLoad record IDs to process
@@ -22,7 +24,23 @@ Example:
     >>> print(result)
     "Processing Complete"
 """
+import os
+import shutil
+import logging
+import requests
+from time import time
+from glob import glob
+from django.conf import settings
 from .models import ExtractTransformLoad
+from .download import download_imagery
+from .utils import standardize_names, calibrate_images, import_pois, write_poi_catalog, upload_to_auzre, estimate_calibrated_bytes, BackgroundUploader
+from .workspace import Workspace
+from utils.raster_ops import build_cog, cog_profile, estimate_cog_bytes
+from utils.detection import detect_interesting_points
+
+logger = logging.getLogger('animal')
+
+CATALOG_CONTENT_TYPES = {'parquet': 'application/vnd.apache.parquet', 'geojson': 'application/geo+json'}
 
 def process_etl_data(filtered_data_ids):
     # Fetch model objects for processing
@@ -35,4 +53,174 @@ def process_etl_data(filtered_data_ids):
 
 def process_data(etl):
     # Simulate processing by performing operations on the ETL data
-    pass
\ No newline at end of file
+    pass
+
+def process_pair(session, pair):
+    """ Downloads a PAN, MSI entity pair from EarthExplorer, then calibrates,
+            pansharpens, and converts it to a COG, generates its interesting
+            points, registers them, and uploads every artifact to Azure. Each
+            pair is processed within its own scoped, budgeted workspace.
+
+        SESSION - An EarthExplorer session (see ee_login)
+        PAIR - A dictionary of the PAN entity ID to its MSI entity ID
+
+        Raises DiskBudgetExceeded when the pair cannot fit the disk budget,
+            and any other failure, so the caller can report the pair.
+    """
+    with Workspace('_'.join(pair.keys())) as workspace:
+        unzipped_dirs = []
+        print(f"Your pair looks like: {pair}")
+        for pan_entity_id, msi_entity_id in pair.items():
+            print(f"Your PAN entity id is: {pan_entity_id}, your MSI entity id is: {msi_entity_id}")
+
+            start = time()
+            unzipped_dirs.append(download_imagery(session, 'crssp_orderable_w3', pan_entity_id, workspace=workspace))
+            print(f"\n It took: {round(time() - start,2)} seconds to download and unzip {pan_entity_id}, your panchromatic image \n")
+
+            start = time()
+            unzipped_dirs.append(download_imagery(session, 'crssp_orderable_w3', msi_entity_id, workspace=workspace))
+            print(f"\n It took: {round(time() - start,2)} seconds to download and unzip {msi_entity_id}, your multispectral image \n")
+
+        # BLOCK THIS OUT WHEN DEBUGGING
+        # Upload these retrieved files to Azure
+        # for unzipped_dir in unzipped_dirs:
+        #     start = time()
+        #     # Get all files from within the unzipped directory, less the license files
+        #     unzipped_files = glob(unzipped_dir + '/**/*.*', recursive=True)
+        #     filtered_files = [file for file in unzipped_files if 'license' not in file]
+
+        #     # Determine the image directory name
+        #     dir_name = filtered_files[0].replace('\\', '/').split('/')[-2].split('.')[0]
+        #     # Upload files to Azure
+        #     for file in filtered_files:
+        #         print(f"Uploading: {file}")
+        #         upload_to_auzre(file, f'data/imagery/ee/{dir_name}', '')
+        #     print(f"\n It took: {round(time() - start,2)} seconds to upload {dir_name}, a full directory, to Azure \n\n")
+
+        # Standarize file names
+        print(f"Your unzipped directories looks like: {unzipped_dirs}")
+        standard_name_geotiffs = []
+        for unzipped_dir in unzipped_dirs:
+            print(f"Your unzipped dir looks like: {unzipped_dir}")
+            try:
+                standard_name_geotiffs.append(standardize_names(unzipped_dir))
+            except Exception as e:
+                standard_name_geotiffs.append(unzipped_dir)
+                print(f"Failed standardizing names with Exception: {e}.\n\tTrying to move along...")
+
+        # Calibrate the panchromatic and multispectral images concurrently, once the
+        #      disk budget can hold them. They are kept until the workspace is removed
+        reserve_timeout = getattr(settings, 'WORKSPACE_RESERVE_TIMEOUT', 3600)
+        workspace.reserve('calibrated', sum(estimate_calibrated_bytes(tiff) for tiff in standard_name_geotiffs),
+                          timeout=reserve_timeout)
+        start = time()
+        print("Begining to calibrate the images...")
+        calibrated = calibrate_images(standard_name_geotiffs, **getattr(settings, 'CALIBRATION_OPTIONS', {}))
+        calibrated_images = [image for image in calibrated.values() if image]
+        print(f"\n It took: {round(time() - start,2)} seconds to calibrate {len(calibrated_images)} images \n")
+
+        # Upload artifacts to Azure in the background as each is finalized, waiting on any
+        #      still running once the pair is done
+        with BackgroundUploader(skip_existing=True) as uploader:
+            # Upload these calibrated files, and their supporting files
+            for calibrated_image in calibrated_images:
+                print(f"\n Your calibrated image name is: {calibrated_image} \n")
+                dir_name = os.path.basename(calibrated_image).split('.')[0]
+                for file in glob(os.path.splitext(calibrated_image)[0] + '.*'):
+                    uploader.submit(file, f'data/imagery/calibrated/{dir_name}', '')
+
+            # Identify the calibrated pair
+            for calibrated_image in calibrated_images:
+                if 'P1BS' in calibrated_image:
+                    pan_image = calibrated_image
+                elif 'M1BS' in calibrated_image:
+                    msi_image = calibrated_image
+                else:
+                    print("\n\nYOUR IMAGE DOES NOT FOLLOW THE STANDARD NAMING CONVENTION FOR MAXAR\n\n")
+
+            shrp_image = pan_image.split('/')[-1].replace('P1BS', 'S1BS')
+            print(f"YOUR SHARP IMAGE IS: {shrp_image}")
+            catalog_format = getattr(settings, 'POI_CATALOG_FORMAT', 'parquet')
+            out_catalog = os.path.join(workspace.stage('points'), shrp_image.replace('tif', catalog_format))
+
+            # The COG is written to a temporary location within the workspace
+            cog_dir = workspace.stage('cog')
+            cogtiff = os.path.join(cog_dir, shrp_image.replace('.tif', '_cog.tif'))
+
+            # Upload the COG as soon as it is finalized, alongside point generation
+            def upload_cog(ds):
+                return uploader.submit(ds.GetDescription(), 'data/cog', '')
+
+            # Generate interesting point catalog from the pansharpened VRT, on the
+            #      pair's native UTM grid, opposed to the web tiled COG. Failures
+            #      propagate, failing the pair, as there is no catalog to import
+            def generate_points(ds):
+                start = time()
+                points = detect_interesting_points(ds, 'big_window', 20,
+                                                   max_workers=getattr(settings, 'DETECTION_WORKERS', None))
+                write_poi_catalog(points, out_catalog)
+                print(f"\n It took: {round(time() - start,2)} seconds to generate interesting points: {out_catalog} \n")
+
+            # Pansharpen to a VRT and write the Cloud Optimized GeoTIFF in-process,
+            #      waiting until the disk budget can hold it, or failing the pair
+            start = time()
+            profile = cog_profile(getattr(settings, 'COG_PROFILE', 'deflate'),
+                                  **getattr(settings, 'COG_CREATION_OPTIONS', {}))
+            cog_bytes = estimate_cog_bytes(pan_image, **profile)
+            print(f"Reserving {round(cog_bytes / 1024 ** 3, 2)} GB of {round(workspace.budget.available / 1024 ** 3, 2)} GB available for your COG")
+            with workspace.reservation('cog', cog_bytes, timeout=reserve_timeout):
+                _, (cog_upload, _) = build_cog(pan_image, msi_image, cogtiff,
+                                               consumers=[upload_cog], source_consumers=[generate_points],
+                                               **profile)
+                print(f"\n It took: {round(time() - start,2)} seconds to pansharpen, create your COG, and generate interesting points \n")
+
+                # The upload reads the COG by path, so it is only removed afterwards
+                cog_upload.result()
+                shutil.rmtree(cog_dir, ignore_errors=True)
+
+            # Add interesting points to database
+            start = time()
+            import_pois(out_catalog)
+            print(f"\n It took: {round(time() - start,2)} seconds to register your interesting point catalog in the database \n")
+
+            # # DON'T INCLUDE THIS FOR QA/QC
+            # # Oversample pansharpened images
+            # start = time()
+            # ultratiff = '.'.join(shrp_image.split('.')[:-1]) + "_ultra.tif"
+            # options = "-overwrite -multi -wm 80% -tr 0.13 0.13 -r cubic -co BIGTIFF=IF_SAFER -co NUM_THREADS=ALL_CPUS -co compress=lzw"
+            # output_dataset = gdal.Warp(ultratiff, shrp_image, format="COG", options=options)
+            # output_dataset = None
+            # print(f"\n It took: {round(time() - start,2)} seconds to oversampled your image: {ultratiff} \n")
+
+            # # Upload the oversampled image to Azure
+            # start = time()
+            # upload_to_auzre(ultratiff, 'json', '')
+            # print(f"\n It took: {round(time() - start,2)} seconds to upload your oversampled image to Azure \n")
+
+            # Upload the interesting point catalog, then wait on any uploads still running
+            start = time()
+            uploader.submit(out_catalog, 'json', CATALOG_CONTENT_TYPES[catalog_format])
+        print(f"\n It took: {round(time() - start,2)} seconds to finish uploading to Azure \n")
+
+def process_imagery(auth_token, pairs):
+    """ Preprocesses PAN, MSI entity pairs (see PROCESS PAIR) in a django-q
+            worker, so the pipeline runs off the request. Only the
+            EarthExplorer auth token is queued, never the user's password.
+
+        AUTH TOKEN - An EarthExplorer auth token (see ee_login)
+        PAIRS - A list of dictionaries of PAN entity IDs to MSI entity IDs
+
+        Returns the pairs processed and failed.
+    """
+    session = requests.Session()
+    session.headers["X-Auth-Token"] = auth_token
+
+    processed, failed = [], []
+    for pair in pairs:
+        try:
+            process_pair(session, pair)
+            processed.append(pair)
+        except Exception as e:
+            logger.error(f"Failed processing {pair} with Exception: {e}")
+            failed.append(pair)
+    return {'processed': processed, 'failed': failed}
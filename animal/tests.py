@@ -0,0 +1,192 @@
+import os
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .models import ExtractTransformLoad, Target
+from .query import search_etl
+from .utils import register_records
+from .workspace import DiskBudget, DiskBudgetExceeded, Workspace
+
+
+class RegisterRecordsTests(TestCase):
+    def test_duplicate_selections_are_registered_once(self):
+        records = [
+            {'id': 1, 'value': 'right_whale', 'label': 'Right whale'},
+            {'id': 2, 'value': 'humpback', 'label': 'Humpback'},
+            {'id': 1, 'value': 'right_whale', 'label': 'North Atlantic right whale'},
+        ]
+
+        created, updated, failed = register_records(Target, records)
+
+        self.assertEqual((created, updated, failed), (2, 0, {}))
+        self.assertEqual(Target.objects.count(), 2)
+        # The last selection of a duplicate is the one registered
+        self.assertEqual(Target.objects.get(id=1).label, 'North Atlantic right whale')
+
+    def test_registered_records_are_updated(self):
+        register_records(Target, [{'id': 1, 'value': 'right_whale', 'label': 'Right whale'}])
+
+        created, updated, failed = register_records(Target, [
+            {'id': 1, 'value': 'right_whale', 'label': 'North Atlantic right whale'},
+            {'id': 2, 'value': 'humpback', 'label': 'Humpback'},
+        ])
+
+        self.assertEqual((created, updated, failed), (1, 1, {}))
+        self.assertEqual(Target.objects.get(id=1).label, 'North Atlantic right whale')
+
+    def test_no_records(self):
+        self.assertEqual(register_records(Target, []), (0, 0, {}))
+
+
+class SearchETLTests(TestCase):
+    """ The ETL table is unmanaged, so it is created for these tests alone. """
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            editor.create_model(ExtractTransformLoad)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(ExtractTransformLoad)
+
+    @classmethod
+    def setUpTestData(cls):
+        ExtractTransformLoad.objects.bulk_create([
+            ExtractTransformLoad(table_name='ee', aoi_id=1, id=f"{i:016d}", vendor_id=f"vendor_{i}",
+                                 entity_id=f"entity_{i}", vendor='Maxar', platform='WORLDVIEW03',
+                                 pixel_size_x=0.3, pixel_size_y=0.3,
+                                 date=date(2024, 1, 1) + timedelta(days=i), publish_date=date(2024, 6, 1),
+                                 geometry='POLYGON((-70 40, -69.9 40, -69.9 40.1, -70 40.1, -70 40))')
+            for i in range(25)
+        ])
+
+    def test_results_beyond_the_limit_are_capped(self):
+        page, capped = search_etl(ExtractTransformLoad.objects.all(), {}, page_size=5, limit=10)
+
+        self.assertTrue(capped)
+        self.assertEqual(page.paginator.count, 10)
+        self.assertEqual(page.paginator.num_pages, 2)
+        # Newest first
+        self.assertEqual(page.object_list[0]['id'], f"{24:016d}")
+
+    def test_results_within_the_limit_are_not_capped(self):
+        page, capped = search_etl(ExtractTransformLoad.objects.all(), {}, page_size=5, limit=25)
+        self.assertFalse(capped)
+        self.assertEqual(page.paginator.count, 25)
+
+        page, capped = search_etl(ExtractTransformLoad.objects.all(), {'vendor_id': 'vendor_3'}, limit=10)
+        self.assertFalse(capped)
+        self.assertEqual([row['id'] for row in page.object_list], [f"{3:016d}"])
+
+    def test_pages_beyond_the_last_are_clamped(self):
+        page, capped = search_etl(ExtractTransformLoad.objects.all(), {}, page=99, page_size=5, limit=10)
+        self.assertEqual(page.number, 2)
+
+
+class DiskBudgetTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.budget = DiskBudget(1000, self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_reserve_and_release(self):
+        self.assertTrue(self.budget.reserve(600, timeout=0))
+        self.assertEqual(self.budget.available, 400)
+        self.assertFalse(self.budget.reserve(500, timeout=0))
+        self.assertEqual(self.budget.reserved, 600)
+
+        self.budget.release(600)
+        self.assertEqual(self.budget.available, 1000)
+        # Releasing more than was reserved never goes negative
+        self.budget.release(1)
+        self.assertEqual(self.budget.reserved, 0)
+
+    def test_reservations_larger_than_the_budget_are_refused(self):
+        with self.assertRaises(ValueError):
+            self.budget.reserve(1001)
+
+    def test_reserve_waits_for_a_release(self):
+        self.budget.reserve(1000)
+        threading.Timer(0.1, self.budget.release, [1000]).start()
+        self.assertTrue(self.budget.reserve(500, timeout=5))
+        self.assertEqual(self.budget.reserved, 500)
+
+    def test_reservation_is_released_after_its_block(self):
+        with self.assertRaises(RuntimeError):
+            with self.budget.reservation(700):
+                self.assertEqual(self.budget.reserved, 700)
+                raise RuntimeError
+        self.assertEqual(self.budget.reserved, 0)
+
+
+class WorkspaceTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.budget = DiskBudget(1000, self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_stages_reserve_and_release_against_the_budget(self):
+        with Workspace('job', self.budget, keep_on_failure=False) as workspace:
+            workspace.reserve('downloads', 300)
+            with workspace.reservation('cog', 500):
+                self.assertEqual(self.budget.reserved, 800)
+                with self.assertRaises(DiskBudgetExceeded):
+                    workspace.reserve('calibrated', 300)
+            self.assertEqual(self.budget.reserved, 300)
+
+            workspace.release('downloads', 100)
+            self.assertEqual(workspace.reserved['downloads'], 200)
+
+        self.assertEqual(self.budget.reserved, 0)
+        self.assertFalse(os.path.exists(workspace.path))
+
+    def test_failed_workspace_is_kept_and_released(self):
+        with self.assertRaises(RuntimeError):
+            with Workspace('job', self.budget, keep_on_failure=True) as workspace:
+                workspace.reserve('downloads', 300)
+                workspace.complete('entity', 'unzipped')
+                raise RuntimeError
+
+        self.assertEqual(self.budget.reserved, 0)
+        self.assertTrue(os.path.exists(os.path.join(workspace.path, Workspace.manifest_name)))
+
+    def test_resumed_workspace_reserves_its_kept_files(self):
+        downloads = os.path.join(self.root.name, 'jobs', 'job', 'downloads')
+        os.makedirs(downloads)
+        with open(os.path.join(downloads, 'scene.tif'), 'wb') as f:
+            f.write(b'0' * 400)
+        with open(os.path.join(self.root.name, 'jobs', 'job', Workspace.manifest_name), 'w') as f:
+            json.dump({'entity': downloads}, f)
+
+        with Workspace('job', self.budget, keep_on_failure=False) as workspace:
+            self.assertTrue(workspace.resumed)
+            self.assertEqual(workspace.completed('entity'), downloads)
+            self.assertEqual(self.budget.reserved, 400)
+
+        self.assertEqual(self.budget.reserved, 0)
+
+    def test_resumed_workspace_beyond_the_budget_is_refused(self):
+        self.budget.reserve(800)
+        downloads = os.path.join(self.root.name, 'jobs', 'job', 'downloads')
+        os.makedirs(downloads)
+        with open(os.path.join(downloads, 'scene.tif'), 'wb') as f:
+            f.write(b'0' * 400)
+        with open(os.path.join(self.root.name, 'jobs', 'job', Workspace.manifest_name), 'w') as f:
+            json.dump({}, f)
+
+        with self.settings(WORKSPACE_RESERVE_TIMEOUT=0):
+            with self.assertRaises(DiskBudgetExceeded):
+                with Workspace('job', self.budget, keep_on_failure=False):
+                    pass
+        self.assertEqual(self.budget.reserved, 800)
@@ -20,6 +20,7 @@ urlpatterns = [
          name='create_point'),
     path('project/<int:project_id>/detect/', login_required(views.detect_page), name='detect_page'),
     path('project/<int:project_id>/detect/<int:id>/', login_required(views.detect_page), name='detect_item_page'),
+    path('project/<int:project_id>/detect/<int:id>/points/', login_required(views.cell_points), name='cell_points'),
     path('cogs/<str:vendor_id>/', views.cog_view, name='cog_view'),
     path('project/<int:project_id>/dissemination/', login_required(views.dissemination_page), name='dissemination_page'),
     path('project/<int:project_id>/validation/', user_passes_test(is_superuser, login_url='/access-denied/')(views.validation), name='validation'),
@@ -8,16 +8,38 @@ Also includes functions for Azure blob storage operations and POI imports.
         get_entity_pairs(entity_id): Gets paired multispectral and panchromatic image IDs.
         convert_ntf_to_tif(ntf): Converts NTF files to GeoTIFF format.
         standardize_names(imgdir): Standardizes image filenames in a directory.
+        find_image(path): Returns a Maxar 1B image given it, or the directory holding it.
+        utm_epsg(tiff): Determines the UTM Zone EPSG code of a Maxar 1B image.
+        rpc_bounds(tiff): Returns the longitude and latitude bounds of a Maxar 1B image.
+        calibrated_name(tiff, epsg): Returns the path a Maxar 1B image is calibrated to.
+        estimate_calibrated_bytes(tiff): Estimates the bytes of a Maxar 1B image once calibrated.
+        calibrate_images(tiffs): Calibrates Maxar 1B images concurrently using PGC method.
         calibrate_image(tiff): Calibrates Maxar 1B images using PGC method.
         convert_to_tiles(tiff): Converts images to web-friendly tiles.
+        poi_catalog_ids(catalog_path): Derives the Vendor ID and EPSG code from a point catalog's name.
+        read_poi_catalog(catalog_path): Reads a point catalog to plain columns.
+        write_poi_catalog(gdf, catalog_path): Writes a point catalog as GeoParquet or GeoJSON.
+        write_pois(catalog): Bulk updates or creates Points of Interest from a read catalog.
         import_pois(geojson_path): Imports Points of Interest from GeoJSON.
+        register_records(model, records): Bulk updates or creates catalog search results.
+        get_blob_service_client(): Returns this worker's shared Azure Blob Service Client.
         upload_to_azure(local_file, azure_dir, content_type): Uploads files to Azure storage.
+        upload_many_to_azure(uploads): Uploads independent files to Azure storage in parallel.
+
+    Classes:
+        BackgroundUploader(): Uploads artifacts to Azure as soon as each is finalized.
 """
 
 import os
+import re
 import sys
+import time
+import hashlib
+import logging
 import subprocess
 from glob import glob
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # Geospatial stack
 from osgeo import gdal
@@ -28,10 +50,15 @@ from azure.storage.blob import BlobServiceClient, ContentSettings
 
 # Django stack
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.contrib.gis.geos import GEOSGeometry
 
 # GAIA stack
 from .models import ExtractTransformLoad as ETL
 from .models import PointsOfInterest as POI
+from utils.pgc_wrapper import prepare_dem
+
+logger = logging.getLogger('animal')
 
 def get_entity_pairs(entity_id):
     if 'M' in entity_id:
@@ -86,38 +113,183 @@ def standardize_names(imgdir):
         print("Standardizing file name")
         new_name = '-'.join(split_name[:-1]) + '.tif'
         os.rename(geotiff, new_name)
+        return new_name
     else:
         print("File name is standardized already. Moving along...")
         return geotiff
-    return glob(imgdir, recursive=True)
 
-def calibrate_image(tiff):
-    """ Calibrates a given Maxar 1B image using the Polar Geospatial Center (PGC) method
-             (see references). Georeferences the images to the nearest UTM zone, applies
-             no stretch to the image, outputs to GeoTIFF format, the image will be
-             16-bit Unsigned Integer, and resampled using cubic convolution.
-    
+def find_image(path):
+    """ Returns a Maxar 1B image (GeoTIFF or NTF) given it, or the directory
+            holding it (e.g., an unzipped download whose names could not be
+            standardized). Raises ValueError unless the directory holds
+            exactly one image, outside of its CALIBRATED directory.
+    """
+    if not os.path.isdir(path):
+        return path
+    images = [image for image in glob(os.path.join(path, '**', '*.*'), recursive=True)
+              if os.path.splitext(image)[1].lower() in ('.tif', '.ntf')
+              and 'calibrated' not in os.path.relpath(image, path).split(os.sep)]
+    if len(images) != 1:
+        raise ValueError(f"Expected one image within {path}, found {len(images)}: {images}")
+    return images[0]
+
+def utm_epsg(tiff):
+    """ Determines the UTM Zone, as an EPSG code, for the center of a raw
+            (i.e., not yet orthorectified) Maxar 1B image using its Rational
+            Polynomial Coefficient (RPC) offsets. This is the same zone
+            PGC's "-p utm" option would choose, but known ahead of time.
+
+        TIFF - A Maxar 1B image
+    """
+    ds = gdal.Open(tiff)
+    rpc = ds.GetMetadata('RPC')
+    ds = None
+    latitude, longitude = float(rpc['LAT_OFF'].split()[0]), float(rpc['LONG_OFF'].split()[0])
+    zone = int((longitude + 180) // 6) % 60 + 1
+    return (32600 if latitude >= 0 else 32700) + zone
+
+def rpc_bounds(tiff):
+    """ Returns the longitude and latitude bounds a raw Maxar 1B image covers,
+            as (min lon, min lat, max lon, max lat), from the extent of its
+            Rational Polynomial Coefficient (RPC) model.
+
+        TIFF - A Maxar 1B image
+    """
+    ds = gdal.Open(tiff)
+    rpc = ds.GetMetadata('RPC')
+    ds = None
+    longitude, latitude = float(rpc['LONG_OFF'].split()[0]), float(rpc['LAT_OFF'].split()[0])
+    long_scale, lat_scale = float(rpc['LONG_SCALE'].split()[0]), float(rpc['LAT_SCALE'].split()[0])
+    return longitude - long_scale, latitude - lat_scale, longitude + long_scale, latitude + lat_scale
+
+def calibrated_name(tiff, epsg):
+    """ Returns the path PGC's orthorectification writes a Maxar 1B image to
+            when projected to EPSG: <image>_u08mr<epsg>.tif, within a
+            CALIBRATED directory alongside the image.
+    """
+    return os.path.join(os.path.dirname(os.path.realpath(tiff)), 'calibrated',
+                        f"{os.path.splitext(os.path.basename(tiff))[0]}_u08mr{epsg}.tif")
+
+def estimate_calibrated_bytes(tiff):
+    """ Estimates the upper bound, in bytes, of a Maxar 1B image once
+            calibrated to 8-bit by CALIBRATE IMAGES. Orthorectification keeps
+            the image's resolution, but its rotated footprint's bounding box
+            may be up to twice its area. Used to reserve local disk before
+            calibrating.
+
+        TIFF - A Maxar 1B image, or the directory holding it
+    """
+    ds = gdal.Open(find_image(tiff))
+    size = ds.RasterXSize * ds.RasterYSize * ds.RasterCount
+    ds = None
+    return 2 * size
+
+def _run_timed(args, env):
+    """ Runs a subprocess returning its return code, wall time, and CPU time
+            (user + system) in seconds. CPU time is only available on
+            platforms supporting os.wait4 (i.e., Linux), otherwise None.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, env=env)
+    if hasattr(os, 'wait4'):
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        cpu = rusage.ru_utime + rusage.ru_stime
+    else:
+        proc.wait()
+        cpu = None
+    return proc.returncode, time.perf_counter() - start, cpu
+
+def calibrate_images(tiffs, max_workers=2, gdal_num_threads=None, gdal_cachemax=2048, dem=None):
+    """ Calibrates Maxar 1B images (e.g., a panchromatic and multispectral pair)
+            concurrently using the Polar Geospatial Center (PGC) method
+            (see references). Each image is orthorectified on its own into a
+            CALIBRATED directory alongside it. Georeferences the images to
+            their UTM zone, applies no stretch to the image, outputs to
+            GeoTIFF format, the image will be 8-bit Unsigned Integer, and
+            resampled using cubic convolution.
+
+        The UTM zone is determined ahead of time and passed to PGC, so each
+            output's path is known (see CALIBRATED NAME) opposed to searched for.
+
+        With a DEM, the images are orthorectified against it, clipped to
+            their bounds and reprojected to their UTM zone once by PREPARE
+            DEM, and cached on disk, so the pair, and later scenes nearby,
+            share one small DEM opposed to each warping from the source DEM.
+
+        GDAL thread and cache settings are passed explicitly to each
+            orthorectification so concurrent runs do not oversubscribe the
+            machine. PGC builds its own gdalwarp command, so its warp
+            memory is bounded by GDAL CACHEMAX.
+
+        TIFFS - Maxar 1B images, or the directories holding them
+        MAX WORKERS - Images calibrated at once (Default: 2, pan and MSI)
+        GDAL NUM THREADS - GDAL_NUM_THREADS for each image (Default: the
+            CPU count divided between the workers)
+        GDAL CACHEMAX - GDAL_CACHEMAX, in megabytes, for each image
+        DEM - Source DEM, relative to the WGS84 ellipsoid (Default:
+            settings.CALIBRATION_DEM, or none, PGC's default)
+
+        Returns a dictionary of each image and its calibrated image, or None
+            if calibration failed.
+
         Ref: https://www.pgc.umn.edu/guides/pgc-coding-and-utilities/using-pgc-github-orthorectification/
         Ref: https://github.com/PolarGeospatialCenter/imagery_utils/blob/main/doc/pgc_ortho.txt
     """
-    dir_path = os.path.dirname(os.path.realpath(tiff))
-    print(f"Your dir_path is: {dir_path}")
-    dir_path_new = os.path.join(dir_path, 'calibrated/') # Make LInux style
-    print(f"Your new dir_oath is: {dir_path_new}")
-    if not os.path.exists(dir_path_new):
-        os.makedirs(dir_path_new)
-
-    # Check -c ns versus mr. Lauren might be processing only three bands.
-    subprocess.run([sys.executable, 'imagery_utils/pgc_ortho.py', '-p', 'utm',
-                    '-c', 'mr', '-f', 'GTiff', '-t', 'Byte', '--resample=cubic',
-                    dir_path, dir_path_new])
-    try:
-        img_out = glob(dir_path_new + "/*.tif")[0]
+    if gdal_num_threads is None:
+        gdal_num_threads = max((os.cpu_count() or 1) // max(min(max_workers, len(tiffs)), 1), 1)
+    env = {**os.environ,
+           'GDAL_NUM_THREADS': str(gdal_num_threads),
+           'GDAL_CACHEMAX': str(gdal_cachemax)}
+
+    images = {}
+    for tiff in tiffs:
+        try:
+            images[tiff] = find_image(tiff)
+        except ValueError as e:
+            print(f"Failed on: {tiff} with Exception: {e}")
+    epsgs = {tiff: utm_epsg(image) for tiff, image in images.items()}
+
+    # One DEM per UTM zone, covering every image in it, prepared before calibrating
+    dem = dem if dem is not None else getattr(settings, 'CALIBRATION_DEM', None)
+    dems = {}
+    if dem:
+        for epsg in set(epsgs.values()):
+            bounds = [rpc_bounds(images[tiff]) for tiff in images if epsgs[tiff] == epsg]
+            start = time.time()
+            dems[epsg] = prepare_dem(dem, (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                                           max(b[2] for b in bounds), max(b[3] for b in bounds)), epsg)
+            print(f"\n It took: {round(time.time() - start, 2)} seconds to prepare your DEM: {dems[epsg]} \n")
+
+    def calibrate(tiff):
+        if tiff not in images:
+            return None
+        image, epsg = images[tiff], epsgs[tiff]
+        img_out = calibrated_name(image, epsg)
+        os.makedirs(os.path.dirname(img_out), exist_ok=True)
+
+        # Check -c ns versus mr. Lauren might be processing only three bands.
+        dem_args = ['--dem', dems[epsg]] if epsg in dems else []
+        returncode, wall, cpu = _run_timed([sys.executable, 'imagery_utils/pgc_ortho.py', '-p', str(epsg), *dem_args,
+                                            '-c', 'mr', '-f', 'GTiff', '-t', 'Byte', '--resample=cubic',
+                                            image, os.path.dirname(img_out)], env)
+        cpu = f"{round(cpu, 2)}" if cpu is not None else "unknown"
+        print(f"\n It took: {round(wall, 2)} seconds (CPU: {cpu} seconds) to calibrate {image} \n")
+
+        if returncode != 0 or not os.path.exists(img_out):
+            print(f"Failed on: {image}")
+            return None
         print(f"Your image is: {img_out}")
         return img_out
-    except:
-        print("Failed on: {}".format(tiff))
-        pass
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(tiffs, executor.map(calibrate, tiffs)))
+
+def calibrate_image(tiff):
+    """ Calibrates a given Maxar 1B image using the Polar Geospatial Center (PGC) method.
+            See CALIBRATE IMAGES.
+    """
+    return calibrate_images([tiff], max_workers=1)[tiff]
 
 def convert_to_tiles(tiff):
     """ Build a Virtual Format (VRT) file to bring images into
@@ -149,54 +321,237 @@ def convert_to_tiles(tiff):
                     tile_dir_name])
     return tile_dir_name
 
-def import_pois(geojson_path):
+def poi_catalog_ids(catalog_path):
+    """ Derives the Vendor ID, using the panchromatic image as the basis for
+            this (opposed to the multispectral), and the EPSG code from an
+            interesting point catalog's file name (e.g.,
+            <vendor id>_u08mr<epsg>[_<suffix>].geojson).
+    """
+    parts = os.path.basename(catalog_path).split('.')[0].split('_')
+    for i, part in enumerate(parts):
+        match = re.fullmatch(r'u\d{2}[a-z]{2}(\d+)', part)
+        if match:
+            return '_'.join(parts[:i]).replace('S1BS', 'P1BS'), match.group(1)
+    return '_'.join(parts[:-1]).replace('S1BS', 'P1BS'), None
+
+def read_poi_catalog(catalog_path):
+    """ Reads an interesting point catalog (GeoJSON or GeoParquet) into plain
+            columns. Touches no database, so catalogs can be read in worker
+            processes and handed to a single writer.
+
+        Returns a dictionary of the Vendor ID and the Sample IDX, area,
+            deviation, EPSG code, and WKB point columns.
+    """
+    vendor_id, epsg = poi_catalog_ids(catalog_path)
+    if catalog_path.endswith('.parquet'):
+        # GeoParquet keeps the CRS of the points it was written with
+        gdf = gpd.read_parquet(catalog_path)
+        epsg = gdf.crs.to_epsg() if gdf.crs else epsg
+    else:
+        # GeoJSON is read as EPSG:4326 whatever its coordinates, so the EPSG
+        #      code of its file name is used opposed to its CRS
+        gdf = gpd.read_file(catalog_path)
+
+    if epsg:
+        epsg_codes = [str(epsg)] * len(gdf)
+    elif 'epsg_code' in gdf.columns:
+        epsg_codes = [str(code) if present else None
+                      for code, present in zip(gdf['epsg_code'], gdf['epsg_code'].notna())]
+    else:
+        epsg_codes = [None] * len(gdf)
+
+    return {
+        'vendor_id': vendor_id,
+        'sample_idx': gdf['id'].astype(str).tolist(),
+        'area': gdf['area'].astype(float).tolist(),
+        'deviation': gdf['deviation'].astype(float).tolist(),
+        'epsg_code': epsg_codes,
+        'point': gdf.geometry.to_wkb().tolist(),
+    }
+
+def write_poi_catalog(gdf, catalog_path):
+    """ Writes an interesting point catalog as GeoParquet (columnar and ZSTD
+            compressed), the interchange format, or as GeoJSON for export,
+            by the extension of CATALOG PATH.
+    """
+    if catalog_path.endswith('.parquet'):
+        gdf.to_parquet(catalog_path, compression='zstd', index=False)
+    else:
+        gdf.to_file(catalog_path, driver='GeoJSON')
+    return catalog_path
+
+def write_pois(catalog, batch_size=2000):
+    """ Updates or creates the Interesting Points records of a catalog read by
+            READ POI CATALOG, combined with its ExtractTransformLoad (ETL)
+            record when one exists.
+
+        Existing records are found by their Vendor ID and Sample IDX with a
+            single query per batch, and every record is written with BULK
+            CREATE or BULK UPDATE, in batches, within one transaction, so
+            re-importing a catalog is idempotent.
+
+        Returns the number of records created and updated.
+    """
+    obj = ETL.objects.filter(vendor_id=catalog['vendor_id']).first()
+    if obj is None:
+        logger.warning(f"No ETL record found for {catalog['vendor_id']}, importing its points without one")
+
+    existing = {}
+    for i in range(0, len(catalog['sample_idx']), batch_size):
+        existing.update(POI.objects.filter(vendor_id=catalog['vendor_id'],
+                                           sample_idx__in=catalog['sample_idx'][i:i + batch_size])
+                                   .values_list('sample_idx', 'id'))
+
+    to_create, to_update = [], []
+    for sample_idx, area, deviation, epsg_code, wkb in zip(catalog['sample_idx'], catalog['area'], catalog['deviation'],
+                                                           catalog['epsg_code'], catalog['point']):
+        poi = POI(id=existing.get(sample_idx),
+                  sample_idx=sample_idx,
+                  catalog_id=obj.id if obj else None,
+                  vendor_id=catalog['vendor_id'],
+                  entity_id=obj.entity_id if obj else None,
+                  area=area,
+                  deviation=deviation,
+                  epsg_code=epsg_code,
+                  point=GEOSGeometry(memoryview(wkb)))
+        (to_update if poi.id else to_create).append(poi)
+
+    with transaction.atomic():
+        POI.objects.bulk_create(to_create, batch_size=batch_size)
+        POI.objects.bulk_update(to_update,
+                                ['catalog_id', 'vendor_id', 'entity_id', 'area', 'deviation', 'epsg_code', 'point'],
+                                batch_size=batch_size)
+
+    return len(to_create), len(to_update)
+
+def import_pois(geojson_path, batch_size=2000):
     """ Synchronous Import Points of Interest function.
 
-        Takes the GeoJSON filepath and converts the file path to Vendor ID
-            using the panchromatic image as the basis for this (opposed to
-            the multispectral). Queries the ExtractTransformLoad (ETL) table
-            in SpatiaLite for the relevant Vendor ID object. Reads the GeoJSON
-            file to a GeoDataFrame. Updates or creates the Interesting Points
-            records from a combination of the ETL and GeoJSON information.
-
-        Print statements support troubleshooting.
-    """
-    vid = '_'.join(geojson_path.split('/')[-1:][0].split('.')[0].split('_')[:-1]).replace('S1BS', 'P1BS')
-    obj = ETL.objects.get(vendor_id=vid)
-    
-    gdf = gpd.read_file(geojson_path)
-
-    for index, row in gdf.iterrows():
-        poi, created = POI.objects.update_or_create(
-            sample_idx = row['id'],
-            defaults={
-                'catalog_id': obj.id,
-                'vendor_id': obj.vendor_id,
-                'entity_id': obj.entity_id,
-                'area': row['area'],
-                'deviation': row['deviation'],
-                'point': row['geometry'].wkt
-            }
-        )
-        print(f"\t{'Created' if created else 'Updated'} POI with id: {poi.sample_idx}\n")
-
-    print('Data imported successfully!')
-
-def upload_to_auzre(local_file, azure_dir, content_type):
+        Takes the GeoParquet, or GeoJSON, filepath and converts the file path
+            to Vendor ID using the panchromatic image as the basis for this
+            (opposed to the multispectral). Reads the catalog to plain columns
+            and updates or creates the Interesting Points records, in bulk,
+            from a combination of the ETL and catalog information.
+
+        See READ POI CATALOG and WRITE POIS.
+
+        GEOJSON PATH - Interesting point catalog (.parquet or .geojson)
+        BATCH SIZE - Records written per query
+
+        Returns the number of records created and updated.
+    """
+    start = time.time()
+    catalog = read_poi_catalog(geojson_path)
+    created, updated = write_pois(catalog, batch_size=batch_size)
+
+    elapsed = time.time() - start
+    print(f"Data imported successfully! Created {created} and updated {updated} POIs "
+          f"in {round(elapsed, 2)} seconds ({round(len(catalog['sample_idx']) / max(elapsed, 1e-6))} rows/sec)")
+    return created, updated
+
+def register_records(model, records, batch_size=500):
+    """ Registers catalog search results (e.g., EarthExplorer, GEOINTDiscovery,
+            or MaxarGeospatialPlatform records) into the database, updating
+            those already registered.
+
+        Existing records are found by primary key with a single query per
+            batch, and every record is written with BULK CREATE or BULK
+            UPDATE within one transaction, so the database is locked for
+            one short write opposed to one per record. Should any record
+            violate a constraint, the records are written one by one
+            instead, each within its own savepoint, so only those failing
+            are skipped.
+
+        MODEL - Django model of the catalog
+        RECORDS - Dictionaries of field values, each including the primary key
+        BATCH SIZE - Records looked up and written per query
+
+        Returns the number of records created and updated, and a dictionary
+            of each failed record's primary key to its error.
+    """
+    if not records:
+        return 0, 0, {}
+
+    # A result selected twice is registered once
+    pk = model._meta.pk.name
+    records = list({record[pk]: record for record in records}.values())
+    keys = [record[pk] for record in records]
+    existing = set()
+    for i in range(0, len(keys), batch_size):
+        existing.update(model.objects.filter(pk__in=keys[i:i + batch_size]).values_list('pk', flat=True))
+
+    to_create, to_update = [], []
+    for record in records:
+        (to_update if record[pk] in existing else to_create).append(model(**record))
+    fields = [field for field in records[0] if field != pk]
+
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(to_create, batch_size=batch_size)
+            model.objects.bulk_update(to_update, fields, batch_size=batch_size)
+        return len(to_create), len(to_update), {}
+    except IntegrityError:
+        pass
+
+    created, updated, failed = 0, 0, {}
+    with transaction.atomic():
+        for obj, create in [(obj, True) for obj in to_create] + [(obj, False) for obj in to_update]:
+            try:
+                with transaction.atomic():
+                    if create:
+                        obj.save(force_insert=True)
+                    else:
+                        obj.save(update_fields=fields)
+            except IntegrityError as e:
+                failed[obj.pk] = str(e)
+                continue
+            created, updated = created + create, updated + (not create)
+
+    return created, updated, failed
+
+@lru_cache(maxsize=None)
+def get_blob_service_client():
+    """ Returns this worker's shared Azure Blob Service Client. The client, and
+            its pooled HTTP connections, are created once per process and
+            reused by every upload opposed to one client per file.
+
+        Blobs larger than MAX SINGLE PUT SIZE are uploaded as blocks of
+            MAX BLOCK SIZE which can be sent in parallel.
+    """
+    account_name = settings.AZURE_STORAGE_ACCOUNT_NAME
+    account_key = settings.AZURE_STORAGE_ACCOUNT_KEY
+    account_url = f"https://{account_name}.blob.core.windows.net"
+    return BlobServiceClient(account_url=account_url,
+                             credential=account_key,
+                             max_single_put_size=16 * 1024 * 1024,
+                             max_block_size=8 * 1024 * 1024)
+
+def file_md5(local_file, chunk_size=8 * 1024 * 1024):
+    """ Returns the MD5 digest of a local file, read in chunks. """
+    md5 = hashlib.md5()
+    with open(local_file, 'rb') as data:
+        for chunk in iter(lambda: data.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.digest()
+
+def upload_to_auzre(local_file, azure_dir, content_type, max_concurrency=8, skip_existing=False, verify=True):
     """ Uploads a file to Azure from a local machine.
 
         LOCAL FILE - Local file to be uploaded to Azure
         AZURE DIR - A directory, nor nest of directories,
             to place the file under.
         CONTENT TYPE - Content of the uploaded file
+        MAX CONCURRENCY - Blocks of large files uploaded in parallel
+        SKIP EXISTING - Skip uploading when a blob of the same size and MD5
+            already exists, replacing it otherwise.
+        VERIFY - Store the file's MD5 on the blob, validate each block's MD5
+            in transit, and confirm the uploaded size.
+
+        Returns the blob name, or None if the upload failed.
     """
     try:
-        account_name = settings.AZURE_STORAGE_ACCOUNT_NAME
-        account_key = settings.AZURE_STORAGE_ACCOUNT_KEY
         container_name = settings.AZURE_CONTAINER_NAME
-
-        account_url = f"https://{account_name}.blob.core.windows.net"
-        blob_service_client = BlobServiceClient(account_url=account_url, credential=account_key)
+        blob_service_client = get_blob_service_client()
 
         local_file = local_file.replace('\\', '/')
         print(f"YOUR LOCAL FILE IS {local_file}")
@@ -204,11 +559,79 @@ def upload_to_auzre(local_file, azure_dir, content_type):
         print(f"YOUR BLOB IS: {blob}")
         blob = blob.replace('_cog.tif', '.tif') if 'cog' in blob else blob
         blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob)
-        content_settings = ContentSettings(content_type=content_type)
+
+        size = os.path.getsize(local_file)
+        md5 = file_md5(local_file) if verify or skip_existing else None
+
+        if skip_existing and blob_client.exists():
+            properties = blob_client.get_blob_properties()
+            if properties.size == size and properties.content_settings.content_md5 == md5:
+                print(f"Skipped uploading {local_file}, {blob} is already up-to-date")
+                return blob
+
+        # Existing blobs are only replaced when they were compared above
+        content_settings = ContentSettings(content_type=content_type, content_md5=md5)
 
         with open(local_file, 'rb') as data:
-            blob_client.upload_blob(data, content_settings=content_settings)
-        print(f"Successfully uploaded {data} to {blob}")
+            blob_client.upload_blob(data,
+                                    length=size,
+                                    overwrite=skip_existing,
+                                    content_settings=content_settings,
+                                    max_concurrency=max_concurrency,
+                                    validate_content=verify)
+
+        if verify and blob_client.get_blob_properties().size != size:
+            raise IOError(f"Uploaded size of {blob} does not match {local_file}")
+        print(f"Successfully uploaded {local_file} to {blob}")
+        return blob
 
     except Exception as e:
         print(f"An error occured: {e}")
+        return None
+
+def upload_many_to_azure(uploads, max_workers=4, **kwargs):
+    """ Uploads independent files to Azure in parallel.
+
+        UPLOADS - A list of (LOCAL FILE, AZURE DIR, CONTENT TYPE) tuples
+        MAX WORKERS - Files uploaded at once
+        KWARGS - Passed to UPLOAD TO AUZRE (e.g., SKIP EXISTING)
+
+        Returns the blob names, None for any failed upload, in order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(upload_to_auzre, *upload, **kwargs) for upload in uploads]
+        return [future.result() for future in futures]
+
+class BackgroundUploader:
+    """ Uploads finished artifacts to Azure in the background as soon as each
+            is finalized, opposed to after the whole pipeline has finished.
+            Large files are sent as parallel staged blocks by UPLOAD TO AUZRE.
+
+        Used as a context manager, every queued upload is waited on when the
+            WITH block exits. Artifacts stay on disk, and in the disk budget,
+            until their workspace removes them.
+
+        MAX WORKERS - Artifacts uploaded at once
+        KWARGS - Passed to UPLOAD TO AUZRE (e.g., SKIP EXISTING)
+    """
+    def __init__(self, max_workers=4, **kwargs):
+        self.kwargs = kwargs
+        self.futures = []
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, local_file, azure_dir, content_type):
+        """ Queues LOCAL FILE for upload, returning its Future. """
+        future = self.executor.submit(upload_to_auzre, local_file, azure_dir, content_type, **self.kwargs)
+        self.futures.append(future)
+        return future
+
+    def wait(self):
+        """ Waits for every queued upload, returning their blob names in order. """
+        return [future.result() for future in self.futures]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.wait()
+        self.executor.shutdown()
@@ -13,6 +13,7 @@ import json
 from django.contrib.gis.geos import Point
 
 from ..models import PointsOfInterest, Annotations, Fishnet, FishnetReviews
+from ..query import COG_EPSG, points_in_cell
 from ..forms import AnnotationForm, FishnetForm, PointsOfInterestForm
 from django.core.paginator import Paginator
 import logging
@@ -358,9 +359,21 @@ def detect_page(request, project_id, id=None):
         'longitude': longitude,
         'latitude': latitude,
         'cogurl': cogurl,
-        'project_id': project_id
+        'project_id': project_id,
     })
 
+def cell_points(request, project_id, id):
+    """ Returns the interesting points within a fishnet cell as JSON, found
+            with the spatial index. The detect page overlays these, and
+            reloads them after its points are created.
+    """
+    try:
+        fishnet = Fishnet.objects.get(id=id, project_id=project_id)
+    except Fishnet.DoesNotExist:
+        return JsonResponse({'error': 'Fishnet cell not found.'}, status=404)
+
+    return JsonResponse({'points': points_in_cell(fishnet.cell, project_id=fishnet.project_id)})
+
 def create_point(request, project_id):
     if request.method == "POST":
         # Accept both JSON and form-data
@@ -385,11 +398,23 @@ def create_point(request, project_id):
         if not points_data or not isinstance(points_data, list):
             return JsonResponse({'error': 'No valid points provided.'}, status=400)
 
+        # Points are associated with a cell spatially: those posted with one must
+        #      fall within it, and take its image and project, so the cell's
+        #      indexed lookup (see cell_points) returns them
+        fishnet = None
+        fishnet_id = request.POST.get('fishnet_id')
+        if fishnet_id:
+            try:
+                fishnet = Fishnet.objects.get(id=fishnet_id, project_id=project_id)
+            except (Fishnet.DoesNotExist, ValueError):
+                return JsonResponse({'error': 'Fishnet cell not found.'}, status=404)
+            to_cell = Transformer.from_crs(CRS("EPSG:4326"), CRS(f"EPSG:{COG_EPSG}"), always_xy=True)
+
         created_points = []
         for point_data in points_data:
             try:
                 geom = point_data.get('geometry')
-                vendor_id = point_data.get('vendor_id')
+                vendor_id = fishnet.vendor_id if fishnet else point_data.get('vendor_id')
                 # Accept geometry as GeoJSON
                 if geom and geom.get('type') == 'Point':
                     coords = geom.get('coordinates')
@@ -397,13 +422,16 @@ def create_point(request, project_id):
                 else:
                     return JsonResponse({'error': 'Invalid geometry.'}, status=400)
 
+                if fishnet and not fishnet.cell.intersects(Point(*to_cell.transform(coords[0], coords[1]))):
+                    return JsonResponse({'error': f'Point {coords} is outside of fishnet cell {fishnet.id}.'}, status=400)
+
                 poi = PointsOfInterest.objects.create(
                     point=point_geom,
                     vendor_id=vendor_id,
                     project_id=project_id,
                     epsg_code=4326
                 )
-                created_points.append({'id': poi.id})
+                created_points.append({'id': poi.id, 'fishnet_id': fishnet.id if fishnet else None})
                 logger.info(f"Point {poi.id} created")
             except Exception as e:
                 logger.error(f"Error creating point: {e}")
@@ -2,20 +2,21 @@
 import os
 import shutil
 import requests
-import subprocess
 from time import time
 from glob import glob
-from osgeo_utils.gdal_pansharpen import gdal_pansharpen
 import django
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.gis.geos import GEOSGeometry
 from django.shortcuts import render
 from django_q.tasks import async_task
 from ..security import ee_login
 from ..models import ExtractTransformLoad
+from ..query import search_etl
 from ..forms import ProcessingForm
 from ..download import download_imagery
-from ..utils import get_entity_pairs, standardize_names, calibrate_image, import_pois, upload_to_auzre  # should be depricated: convert_to_tiles
+from ..utils import get_entity_pairs, standardize_names, import_pois, upload_to_auzre  # should be depricated: convert_to_tiles
+from ..workspace import DiskBudgetExceeded
+from ..tasks import process_pair
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gaia.settings')
 os.environ["CPL_DEBUG"] = "ON" # Should enable GDAL debuggin
@@ -67,161 +68,25 @@ def processing_page(request):
                 list_of_pairs = [get_entity_pairs(entity_id) for entity_id in entity_ids]
                 print(f"Your list of pairs: {list_of_pairs}")
 
+                # Pairs are processed by a django-q worker when one is running, opposed to
+                #      within this request
+                if getattr(settings, 'PROCESSING_ASYNC', False):
+                    task_id = async_task('animal.tasks.process_imagery', session.headers["X-Auth-Token"], list_of_pairs,
+                                         timeout=getattr(settings, 'PROCESSING_TASK_TIMEOUT', None))
+                    messages.success(request, f"Queued {len(list_of_pairs)} pairs for processing as task {task_id}")
+                    return render(request, 'processing_page.html', {'form': form, 'task_id': task_id})
+
                 for pair in list_of_pairs:
                     try:
-                        unzipped_dirs = []
-                        print(f"Your pair looks like: {pair}")
-                        for pan_entity_id, msi_entity_id in pair.items():
-                            print(f"Your PAN entity id is: {pan_entity_id}, your MSI entity id is: {msi_entity_id}")
-                            
-                            start = time()
-                            unzipped_dirs.append(download_imagery(session, 'crssp_orderable_w3', pan_entity_id))
-                            print(f"\n It took: {round(time() - start,2)} seconds to download and unzip {pan_entity_id}, your panchromatic image \n")
-    
-                            start = time()
-                            unzipped_dirs.append(download_imagery(session, 'crssp_orderable_w3', msi_entity_id))
-                            print(f"\n It took: {round(time() - start,2)} seconds to download and unzip {msi_entity_id}, your multispectral image \n")
-    
-                        # BLOCK THIS OUT WHEN DEBUGGING
-                        # Upload these retrieved files to Azure
-                        # for unzipped_dir in unzipped_dirs:
-                        #     start = time()
-                        #     # Get all files from within the unzipped directory, less the license files
-                        #     unzipped_files = glob(unzipped_dir + '/**/*.*', recursive=True)
-                        #     filtered_files = [file for file in unzipped_files if 'license' not in file]
-                            
-                        #     # Determine the image directory name
-                        #     dir_name = filtered_files[0].replace('\\', '/').split('/')[-2].split('.')[0]
-                        #     # Upload files to Azure
-                        #     for file in filtered_files:
-                        #         print(f"Uploading: {file}")
-                        #         upload_to_auzre(file, f'data/imagery/ee/{dir_name}', '')
-                        #     print(f"\n It took: {round(time() - start,2)} seconds to upload {dir_name}, a full directory, to Azure \n\n")
-    
-                        # Standarize file names and calibrate images
-                        print(f"Your unzipped directories looks like: {unzipped_dirs}")
-                        for unzipped_dir in unzipped_dirs:
-                            print(f"Your unzipped dir looks like: {unzipped_dir}")
-                            
-                            start = time()
-                            # Only use this to get the dir name again
-                            unzipped_files = glob(unzipped_dir + '/**/*.*', recursive=True)
-                            print(f"Successfully executed glob: {unzipped_files}")
-                            filtered_files = [file for file in unzipped_files if 'license' not in file]
-                            print("Successfully removed license related files")
-                            dir_name = filtered_files[0].replace('\\', '/').split('/')[-2].split('.')[0]
-                            print(f"Successfully found dir name: {dir_name}")
-
-                            try:
-                                standard_name_geotiff = standardize_names(unzipped_dir)
-                            except Exception as e:
-                                standard_name_geotiff = unzipped_dir
-                                print(f"Failed standardizing names with Exception: {e}.\n\tTrying to move along...")
-                            print("Begining to calibrate the image...")
-                            calibrated_image = calibrate_image(standard_name_geotiff)
-                            print(f"\n It took: {round(time() - start,2)} seconds to calibrate {dir_name} \n")
-    
-                        # Upload these calibrated files to Azure
-                        calibrated_images = []
-                        for unzipped_dir in unzipped_dirs:
-                            start = time()
-                            unzipped_files = glob(unzipped_dir + '/**/*.*', recursive=True)
-                            calibrated_files = [file for file in unzipped_files if 'calibrated' in file]
-                            
-                            for file in calibrated_files:
-                                if 'tif' in file:
-                                    calibrated_images.append(file)
-                                dir_name = file.replace('\\', '/').split('/')[-1].split('.')[0]
-                                upload_to_auzre(file, f'data/imagery/calibrated/{dir_name}', '')
-    
-                            print(f"\n Your calibrated image name is: {calibrated_image} \n")
-                            print(f"\n It took: {round(time() - start,2)} seconds to upload your calibrated image to Azure \n")
-    
-                        # Create a pansharpened image
-                        start = time()
-                        for calibrated_image in calibrated_images:
-                            if 'P1BS' in calibrated_image:
-                                pan_image = calibrated_image
-                            elif 'M1BS' in calibrated_image:
-                                msi_image = calibrated_image
-                            else:
-                                print("\n\nYOUR IMAGE DOES NOT FOLLOW THE STANDARD NAMING CONVENTION FOR MAXAR\n\n")
-    
-                        shrp_image = pan_image.split('/')[-1].replace('P1BS', 'S1BS')
-                        print(f"YOUR SHARP IMAGE IS: {shrp_image}")
-                        gdal_pansharpen(['' ,'-b', '5', '-b', '3', '-b', '2', '-r', 'cubic', '-threads', 'ALL_CPUS', pan_image, msi_image, shrp_image])
-                        print(f"\n It took: {round(time() - start,2)} seconds to create a pansharpened image \n")
-    
-                        # Upload this panchromatic file to Azure
-                        start = time()
-                        upload_to_auzre(shrp_image, f'data/imagery/panchromatic/{dir_name}', '')
-                        print(f"\n It took: {round(time() - start,2)} seconds to upload your panchromatic image to Azure \n")
-    
-                        # Generate interesting point catalog
-                        start = time()
-                        try:
-                            out_geojson = shrp_image.replace('tif', 'geojson')
-                            subprocess.run(['python', 'manage.py', 'generate_points', '--input-file', shrp_image, '--output-file', out_geojson, '--method', 'big_window', '--difference', '20'], check=True, capture_output=True, text=True)
-                            print("Subprocess output:", result.stdout)
-                        except subprocess.CalledProcessError as e:
-                            print("Subprocess failed with return code:", e.returncode)
-                            print("Error output:", e.stderr)
-                        print(f"\n It took: {round(time() - start,2)} seconds to generate interesting points: {out_geojson} \n")
-    
-                        # Upload the interesting point catalog to Azure
-                        upload_to_auzre(out_geojson, 'json', 'application/geo+json')
-    
-                        # Add interesting points to database
-                        start = time()
-                        import_pois(out_geojson)
-                        print(f"\n It took: {round(time() - start,2)} seconds to register your interesting point catalog in the database \n")
-    
-                        # # DON'T INCLUDE THIS FOR QA/QC
-                        # # Oversample pansharpened images
-                        # start = time()
-                        # ultratiff = '.'.join(shrp_image.split('.')[:-1]) + "_ultra.tif"
-                        # options = "-overwrite -multi -wm 80% -tr 0.13 0.13 -r cubic -co BIGTIFF=IF_SAFER -co NUM_THREADS=ALL_CPUS -co compress=lzw"
-                        # output_dataset = gdal.Warp(ultratiff, shrp_image, format="COG", options=options)
-                        # output_dataset = None
-                        # print(f"\n It took: {round(time() - start,2)} seconds to oversampled your image: {ultratiff} \n")
-    
-                        # # Upload the oversampled image to Azure
-                        # start = time()
-                        # upload_to_auzre(ultratiff, 'json', '')
-                        # print(f"\n It took: {round(time() - start,2)} seconds to upload your oversampled image to Azure \n")
-    
-                        # Generate Cloud Optimized GeoTIFF
-                        start = time()
-                        cogtiff = shrp_image.replace('.tif', '_cog.tif')
-                        subprocess.run(['rio', 'cogeo', 'create', '--zoom-level', '20', '--overview-resampling', 'cubic', '-w', shrp_image, cogtiff])
-                        print(f"\n It took: {round(time() - start,2)} seconds to create your COG: {cogtiff} \n")
-    
-                        # Upload the COG image to Azure
-                        start = time()
-                        upload_to_auzre(cogtiff, 'data/cog', '')
-                        print(f"\n It took: {round(time() - start,2)} seconds to upload your COG image to Azure \n")
-    
-                        try:
-                            for unzipped_dir in unzipped_dirs:
-                                shutil.rmtree(unzipped_dir)
-                        except:
-                            print("Unable to detele unzipped directories")
-                        try:
-                            os.remove(shrp_image)
-                        except:
-                            print("Unable to remove sharpened image")
-                        try:
-                            os.remove(out_geojson)
-                        except:
-                            print("Unable to remove GeoJSON file")
-                        try:
-                            os.remove(cogtiff)
-                        except:
-                            print("Unable to remove cog")
-                        print("Done carrying out garbage collection.")
-                        
+                        process_pair(session, pair)
+
+                    except DiskBudgetExceeded as e:
+                        print(f"Failed on {pair} with Exception: {e}")
+                        messages.warning(request, f"{', '.join(pair.keys())} was not processed: {e}")
+
                     except Exception as e:
                         print(f"Failed on {pair} with Exception: {e}")
+                        messages.error(request, f"{', '.join(pair.keys())} failed processing: {e}")
                         
                 # entities = [entity for record_list in entities for entity in record_list]
                 # print(f"2. Your entities are: {entities}")
@@ -405,76 +270,16 @@ def processing_page(request):
         elif 'filter' in request.POST:
             form = ProcessingForm(request.POST)
             if form.is_valid():
-                filtered_data = ExtractTransformLoad.objects.all()
-                # print("\n\nUnfiltered data: ", filtered_data, '\n\n')
-                if form.cleaned_data['table_name']:
-                    filtered_data = filtered_data.filter(table_name = form.cleaned_data['table_name'])
-                if form.cleaned_data['id']:
-                    filtered_data = filtered_data.filter(id = form.cleaned_data['id'])
-                if form.cleaned_data['vendor_id']:
-                    filtered_data = filtered_data.filter(vendor_id = form.cleaned_data['vendor_id'])
-                if form.cleaned_data['entity_id']:
-                    filtered_data = filtered_data.filter(entity_id = form.cleaned_data['entity_id'])
-                if form.cleaned_data['vendor']:
-                    filtered_data = filtered_data.filter(vendor = form.cleaned_data['vendor'])
-                if form.cleaned_data['platform']:
-                    filtered_data = filtered_data.filter(platform = form.cleaned_data['platform'])
-                if form.cleaned_data['pixel_x_min']:
-                    filtered_data = filtered_data.filter(pixel_x_min = form.cleaned_data['pixel_x_min'])
-                if form.cleaned_data['pixel_x_max']:
-                    filtered_data = filtered_data.filter(pixel_x_max = form.cleaned_data['pixel_x_max'])
-                if form.cleaned_data['pixel_y_min']:
-                    filtered_data = filtered_data.filter(pixel_y_min = form.cleaned_data['pixel_y_min'])
-                if form.cleaned_data['pixel_y_max']:
-                    filtered_data = filtered_data.filter(pixel_y_max = form.cleaned_data['pixel_y_max'])
-                if form.cleaned_data['date_min']:
-                    filtered_data = filtered_data.filter(date__gte = form.cleaned_data['date_min'])
-                if form.cleaned_data['date_max']:
-                    filtered_data = filtered_data.filter(date__lte = form.cleaned_data['date_max'])
-                if form.cleaned_data['publish_date_min']:
-                    filtered_data = filtered_data.filter(publish_date__gte = form.cleaned_data['publish_date_min'])
-                if form.cleaned_data['publish_date_max']:
-                    filtered_data = filtered_data.filter(publish_date__lte = form.cleaned_data['publish_date_max'])
-                if form.cleaned_data['aoi']:
-                    try:
-                        aoi_geom =  GEOSGeometry(form.cleaned_data['aoi'].geometry)
-                    except (ValueError, TypeError) as e:
-                        aoi_geom = None
-                        #print(f"Error loading AOI geometry: {e}")
-
-                    intersecting_data = []
-
-                    for etl in filtered_data:
-                        #print(etl.geometry)
-                        try:
-                            geom = GEOSGeometry(etl.geometry)
-                            if geom.intersects(aoi_geom):
-                                intersecting_data.append(etl)
-                        except (ValueError, TypeError) as e:
-                            print(f"Error loading geometry for ETL ID {etl.id}: {e}")
-
-                    filtered_data = intersecting_data
-                    #print("\n\nFiltered data: ", filtered_data, '\n\n')
-
-                geojson_data = [
-                {
-                    'id': etl.id,
-                    'geometry': GEOSGeometry(etl.geometry).geojson,
-                    'vendor_id': etl.vendor_id,
-                    'entity_id': etl.entity_id,
-                    'vendor': etl.vendor,
-                    'platform': etl.platform,
-                    'date': etl.date,
-                    'publish_date': etl.publish_date,
-                    'pixel_size_x': etl.pixel_size_x,
-                    'pixel_size_y': etl.pixel_size_y,
-                }
-                    for etl in filtered_data
-                ]
-
-                #print("\n\nGEOJSON data: ", geojson_data, '\n\n')
-                
-                return render(request, 'processing_page.html', {'form': form, 'filtered_data': geojson_data})
+                aoi = form.cleaned_data['aoi']
+                page, capped = search_etl(ExtractTransformLoad.objects.all(),
+                                          form.cleaned_data,
+                                          aoi=aoi.geometry if aoi else None,
+                                          predicate=form.cleaned_data['predicate'],
+                                          page=form.cleaned_data['page'] or 1)
+                if capped:
+                    messages.warning(request, f"Showing the first {page.paginator.count} results; narrow your search to see the rest")
+
+                return render(request, 'processing_page.html', {'form': form, 'filtered_data': page.object_list, 'page': page})
                 
         elif 'process' in request.POST:
             selected_ids = request.POST.getlist('select_images')
@@ -0,0 +1,233 @@
+"""
+Local disk management for the imagery processing pipeline.
+
+Imagery is downloaded, calibrated, pansharpened, and converted to Cloud Optimized
+GeoTIFFs (COGs) on a small container volume. Stages reserve the bytes they expect
+to write against a shared, configurable budget before writing them and release
+them once the files are uploaded and removed, so concurrent work never overruns
+the volume.
+
+Each job runs in its own Workspace, a scoped directory under the workspace root
+with one subdirectory per stage, which is removed when the job finishes or kept
+so a failed job can resume where it left off.
+
+    Classes:
+        DiskBudget(budget, path): Thread-safe reservations of local disk bytes.
+        Workspace(name, budget): A per-job scoped directory with per-stage budgeting.
+        DiskBudgetExceeded: Raised when a stage cannot reserve the bytes it needs.
+
+    Functions:
+        get_disk_budget(): Returns this worker process's shared disk budget.
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+
+# Django stack
+from django.conf import settings
+
+logger = logging.getLogger('animal')
+
+class DiskBudgetExceeded(Exception):
+    """ Raised when a stage cannot reserve the bytes it needs within the disk budget. """
+
+class DiskBudget:
+    """ Thread-safe byte reservations against a local disk budget.
+
+        BUDGET - Bytes stages may reserve in total (Default:
+            settings.WORKSPACE_DISK_BUDGET), never more than the free space
+            on the volume holding PATH when the budget was created.
+        PATH - A directory on the volume being budgeted (Default:
+            settings.WORKSPACE_ROOT)
+    """
+    def __init__(self, budget=None, path=None):
+        self.path = path or settings.WORKSPACE_ROOT
+        os.makedirs(self.path, exist_ok=True)
+
+        budget = budget if budget is not None else settings.WORKSPACE_DISK_BUDGET
+        self.budget = min(budget, shutil.disk_usage(self.path).free)
+        self.reserved = 0
+        self._condition = threading.Condition()
+
+    @property
+    def available(self):
+        return self.budget - self.reserved
+
+    def reserve(self, nbytes, timeout=None):
+        """ Reserves NBYTES, waiting up to TIMEOUT seconds (Default: forever)
+                for other stages to release theirs. Returns False when the
+                reservation could not be made in time.
+        """
+        if nbytes > self.budget:
+            raise ValueError(f"{nbytes} bytes exceeds the {self.budget} byte disk budget")
+
+        with self._condition:
+            if not self._condition.wait_for(lambda: nbytes <= self.available, timeout=timeout):
+                return False
+            self.reserved += nbytes
+            return True
+
+    def release(self, nbytes):
+        """ Releases NBYTES previously reserved. """
+        with self._condition:
+            self.reserved = max(self.reserved - nbytes, 0)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reservation(self, nbytes, timeout=None):
+        """ Reserves NBYTES for the duration of a WITH block. """
+        if not self.reserve(nbytes, timeout=timeout):
+            raise TimeoutError(f"Timed out waiting for {nbytes} bytes of the disk budget")
+        try:
+            yield nbytes
+        finally:
+            self.release(nbytes)
+
+@lru_cache(maxsize=None)
+def get_disk_budget():
+    """ Returns this worker's shared disk budget.
+
+        The budget is shared by the jobs of one process only; each process
+            (e.g., gunicorn or django-q worker) gets its own. Size
+            WORKSPACE_DISK_BUDGET as the volume's bytes divided by the
+            processes running jobs on it.
+    """
+    return DiskBudget()
+
+class Workspace:
+    """ A scoped working directory for one processing job, used as a context
+            manager. Every stage (e.g., downloads, cog) writes into its own
+            subdirectory and reserves its expected bytes against the shared
+            disk budget before writing.
+
+        On success the workspace is removed. On failure it is removed as
+            well, unless KEEP ON FAILURE, in which case it is kept with its
+            manifest so the job can resume from its completed steps. A
+            resumed workspace reserves the bytes its kept files hold before
+            any stage writes more.
+
+        NAME - Job name, used as the workspace's directory name
+        BUDGET - A DiskBudget (Default: this worker's shared disk budget)
+        KEEP ON FAILURE - Keep the workspace of a failed job (Default:
+            settings.WORKSPACE_KEEP_FAILED)
+    """
+    manifest_name = 'workspace.json'
+
+    def __init__(self, name, budget=None, keep_on_failure=None):
+        self.budget = budget or get_disk_budget()
+        self.path = os.path.join(self.budget.path, 'jobs', name)
+        self.keep_on_failure = (keep_on_failure if keep_on_failure is not None
+                                else getattr(settings, 'WORKSPACE_KEEP_FAILED', False))
+        self.reserved = {}
+        self._lock = threading.Lock()
+
+        self.resumed = os.path.exists(os.path.join(self.path, self.manifest_name))
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, self.manifest_name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def stage(self, stage):
+        """ Returns, creating if needed, the directory for STAGE. """
+        path = os.path.join(self.path, stage)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def reserve(self, stage, nbytes, timeout=0):
+        """ Reserves NBYTES for STAGE, waiting up to TIMEOUT seconds (Default:
+                refuse immediately) for other jobs to release theirs. Raises
+                DiskBudgetExceeded when the budget cannot hold them.
+        """
+        try:
+            reserved = self.budget.reserve(nbytes, timeout=timeout)
+        except ValueError as e:
+            raise DiskBudgetExceeded(str(e))
+        if not reserved:
+            waited = f" after waiting {timeout} seconds" if timeout else ""
+            raise DiskBudgetExceeded(f"{stage} needs {nbytes} bytes, only {self.budget.available} "
+                                     f"of the {self.budget.budget} byte disk budget are available{waited}")
+        with self._lock:
+            self.reserved[stage] = self.reserved.get(stage, 0) + nbytes
+
+    def release(self, stage, nbytes=None):
+        """ Releases NBYTES (Default: all) reserved by STAGE. """
+        with self._lock:
+            nbytes = min(nbytes if nbytes is not None else self.reserved.get(stage, 0),
+                         self.reserved.get(stage, 0))
+            self.reserved[stage] = self.reserved.get(stage, 0) - nbytes
+        self.budget.release(nbytes)
+
+    @contextmanager
+    def reservation(self, stage, nbytes, timeout=None):
+        """ Reserves NBYTES for STAGE for the duration of a WITH block,
+                waiting up to TIMEOUT seconds (Default: forever).
+        """
+        self.reserve(stage, nbytes, timeout=timeout)
+        try:
+            yield nbytes
+        finally:
+            self.release(stage, nbytes)
+
+    def usage(self):
+        """ Returns the bytes currently on disk for each stage. """
+        usage = {}
+        for stage in os.listdir(self.path):
+            stage_path = os.path.join(self.path, stage)
+            if os.path.isdir(stage_path):
+                usage[stage] = sum(os.path.getsize(os.path.join(root, f))
+                                   for root, _, files in os.walk(stage_path) for f in files)
+        return usage
+
+    def completed(self, key):
+        """ Returns what was recorded for a completed step, or None. """
+        return self.manifest.get(key)
+
+    def complete(self, key, value):
+        """ Records a completed step (e.g., a download) so a kept workspace
+                can resume without repeating it.
+        """
+        with self._lock:
+            self.manifest[key] = value
+            with open(os.path.join(self.path, self.manifest_name), 'w') as f:
+                json.dump(self.manifest, f)
+
+    def cleanup(self):
+        """ Removes the workspace and releases every stage's reservation. """
+        for stage in list(self.reserved):
+            self.release(stage)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        if self.resumed:
+            logger.info(f"Resuming workspace {self.path} with completed steps: {list(self.manifest)}")
+            # Kept files are on disk already, so count them against the budget, waiting
+            #      like any other stage for other jobs to release theirs
+            timeout = getattr(settings, 'WORKSPACE_RESERVE_TIMEOUT', 3600)
+            try:
+                for stage, nbytes in self.usage().items():
+                    self.reserve(stage, nbytes, timeout=timeout)
+            except DiskBudgetExceeded:
+                for stage in list(self.reserved):
+                    self.release(stage)
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        logger.debug(f"Workspace {self.path} bytes by stage: {self.usage()}")
+        if exc_type is not None and self.keep_on_failure:
+            for stage in list(self.reserved):
+                self.release(stage)
+            logger.info(f"Keeping workspace {self.path} to resume after: {exc}")
+        else:
+            self.cleanup()
+        return False
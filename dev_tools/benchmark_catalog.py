@@ -0,0 +1,110 @@
+# ------------------------------------------------------------------------------
+# ----- benchmark_catalog.py ---------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Benchmark parsing a 10,000 result EarthExplorer scene-search
+#              response in one pass against appending a row per result
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries, configure environment
+# ------------------------------------------------------------------------------
+import os
+import sys
+import json
+import random
+from time import time
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+project_dir = "../"
+project_dir = os.path.abspath(project_dir)
+sys.path.append(str(project_dir))
+
+from utils.catalog import ee_gdf
+
+
+# ------------------------------------------------------------------------------
+# User defined variables
+# ------------------------------------------------------------------------------
+# Optionally, a saved scene-search response whose results are repeated to N RESULTS
+response_json = ""
+n_results = 10000
+aoi_id = 1
+
+
+# ------------------------------------------------------------------------------
+# Scene-search response
+# ------------------------------------------------------------------------------
+fields = ['Entity ID', 'Acquisition Date', 'Vendor', 'Vendor ID', 'Catalog ID', 'Cloud Cover',
+          'Satellite', 'Sensor', 'Number of Bands', 'Map Projection', 'UTM Zone', 'Datum',
+          'Processing Level', 'File Format', 'License ID', 'Sun Azimuth', 'Sun Elevation',
+          'Pixel Size X', 'Pixel Size Y', 'License Uplift Update', 'Event', 'Event Date',
+          'Date Entered', 'Center Latitude', 'Center Longitude', 'Center Latitude dec',
+          'Center Longitude dec', 'NW Corner Lat', 'NW Corner Long', 'NE Corner Lat',
+          'NE Corner Long', 'SE Corner Lat', 'SE Corner Long', 'SW Corner Lat', 'SW Corner Long']
+
+def synthetic_result(i):
+    x, y = random.uniform(-75, -65), random.uniform(35, 45)
+    ring = [[x, y], [x + 0.15, y], [x + 0.15, y + 0.12], [x, y + 0.12], [x, y]]
+    return {
+        'metadata': [{'fieldName': field, 'value': f"{field} {i}"} for field in fields],
+        'browse': [{'thumbnailPath': f"https://ims.cr.usgs.gov/thumbnail/{i}.jpg"}],
+        'publishDate': "2024-01-01 00:00:00-05",
+        'spatialBounds': {'type': 'Polygon', 'coordinates': [ring]},
+    }
+
+if response_json:
+    with open(response_json) as f:
+        saved = json.load(f)['data']['results']
+    results = [saved[i % len(saved)] for i in range(n_results)]
+    print(f"\nBenchmarking over {n_results} results repeated from {response_json}\n")
+else:
+    results = [synthetic_result(i) for i in range(n_results)]
+    print(f"\nBenchmarking over {n_results} synthetic results\n")
+
+
+# ------------------------------------------------------------------------------
+# Previous implementation, one appended row per result
+# ------------------------------------------------------------------------------
+start = time()
+columns = [field['fieldName'] for field in results[0]['metadata']]
+gdf = gpd.GeoDataFrame(columns = columns)
+
+for result in results:
+    gdf.loc[gdf.shape[0]] = [field['value'] for field in result['metadata']]
+
+gdf['thumbnail'] = pd.Series([result['browse'][0]['thumbnailPath'] for result in results])
+gdf['publish_date'] = pd.Series([result['publishDate'] for result in results])
+gdf['bounds'] = gpd.GeoSeries([Polygon(result['spatialBounds']['coordinates'][0]) for result in results])
+gdf['aoi'] = aoi_id
+gdf = gdf.set_geometry("bounds").set_crs("EPSG:4326")
+
+drop_columns = [column for column in columns if "Corner" in column] + ['Center Latitude', 'Center Longitude']
+gdf = gdf.drop(drop_columns, axis=1)
+loop_time = time() - start
+print(f"Row appends: {len(gdf)} results in {round(loop_time, 2)} seconds")
+
+
+# ------------------------------------------------------------------------------
+# Single pass implementation
+# ------------------------------------------------------------------------------
+start = time()
+parsed = ee_gdf(results, aoi_id)
+parse_time = time() - start
+print(f"ee_gdf: {len(parsed)} results in {round(parse_time, 2)} seconds")
+print(f"\nSpeed up: {round(loop_time / max(parse_time, 1e-6), 1)}x")
+
+
+# ------------------------------------------------------------------------------
+# Confirm both produce the same table
+# ------------------------------------------------------------------------------
+print(f"Same columns: {list(gdf.columns) == list(parsed.columns)}")
+print(f"Same values: {gdf.drop(columns='bounds').astype(str).equals(parsed.drop(columns='bounds').astype(str))}")
+print(f"Same footprints: {bool(gdf.geometry.geom_equals(parsed.geometry).all())}")
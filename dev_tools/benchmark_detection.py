@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------------------
+# ----- benchmark_detection.py -------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Benchmark tiled interesting point detection searched in-process
+#              against a pool of worker processes, over a pansharpened VRT
+#              built the way the processing pipeline builds it
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries, configure environment
+# ------------------------------------------------------------------------------
+import os
+import sys
+from time import time
+
+project_dir = "../"
+project_dir = os.path.abspath(project_dir)
+sys.path.append(str(project_dir))
+
+from utils.raster_ops import pansharpen_to_vrt
+from utils.detection import detect_interesting_points
+
+
+# ------------------------------------------------------------------------------
+# User defined variables
+# ------------------------------------------------------------------------------
+# A calibrated panchromatic and multispectral pair, as calibrate_images writes them
+pan_image = ""
+msi_image = ""
+vrt = "./benchmark_detection.vrt"
+difference = 20
+max_workers = os.cpu_count()
+
+
+# ------------------------------------------------------------------------------
+# Pansharpened VRT
+# ------------------------------------------------------------------------------
+pansharpen_to_vrt(pan_image, msi_image, vrt)
+
+
+# ------------------------------------------------------------------------------
+# In-process implementation
+# ------------------------------------------------------------------------------
+start = time()
+serial = detect_interesting_points(vrt, 'big_window', difference, max_workers=1)
+serial_time = time() - start
+print(f"In-process: {len(serial)} points in {round(serial_time, 2)} seconds")
+
+
+# ------------------------------------------------------------------------------
+# Worker pool implementation
+# ------------------------------------------------------------------------------
+start = time()
+pooled = detect_interesting_points(vrt, 'big_window', difference, max_workers=max_workers)
+pooled_time = time() - start
+print(f"{max_workers} workers: {len(pooled)} points in {round(pooled_time, 2)} seconds")
+print(f"\nSpeed up: {round(serial_time / max(pooled_time, 1e-6), 1)}x")
+
+
+# ------------------------------------------------------------------------------
+# Confirm both find the same points
+# ------------------------------------------------------------------------------
+print(f"Same points: {bool(serial.geometry.geom_equals(pooled.geometry).all()) if len(serial) == len(pooled) else False}")
+print(f"Same areas: {serial['area'].equals(pooled['area'])}")
+
+os.remove(vrt)
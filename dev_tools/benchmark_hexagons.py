@@ -0,0 +1,113 @@
+# ------------------------------------------------------------------------------
+# ----- benchmark_hexagons.py --------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Benchmark the vectorized hexagon grid against the previous
+#              create_fishnet hexagon loop, building each hexagon
+#              individually with create_hexagon. The previous loop spaced
+#              rows by cell_height; hexagon_grid ignores cell_height and
+#              spaces rows by the hexagon's own height, so the two only
+#              build the same grid when cell_height equals cell_width
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries, configure environment
+# ------------------------------------------------------------------------------
+import os
+import sys
+import math
+from time import time
+from glob import glob
+import shapely
+
+# Set PROJ_LIB environment variable to fix projection issues
+os.environ['PROJ_LIB'] = '/opt/conda/envs/gaia/share/proj'
+
+project_dir = "../"
+project_dir = os.path.abspath(project_dir)
+sys.path.append(str(project_dir))
+
+from osgeo import gdal
+from shapely.geometry import box
+from utils.spatial_ops import create_hexagon, hexagon_grid
+
+
+# ------------------------------------------------------------------------------
+# User defined variables
+# ------------------------------------------------------------------------------
+data_dir = ""
+sub_dir = ""
+cell_width = 600
+cell_height = 400
+
+# A full WorldView scene, roughly 17 by 14 km, when no COG is found
+default_bounds = (0, 0, 17000, 14000)
+
+
+# ------------------------------------------------------------------------------
+# Scene extent
+# ------------------------------------------------------------------------------
+data_dir = os.path.abspath(data_dir)
+cogs = glob(os.path.join(data_dir, sub_dir, '**', "*.tif"), recursive=True)
+
+if cogs:
+    ds = gdal.Open(cogs[0])
+    gt = ds.GetGeoTransform()
+    bounds = (gt[0], gt[3] + ds.RasterYSize * gt[5], gt[0] + ds.RasterXSize * gt[1], gt[3])
+    ds = None
+    print(f"\nBenchmarking over {cogs[0]}: {bounds}\n")
+else:
+    bounds = default_bounds
+    print(f"\nNo COG found, benchmarking over {bounds}\n")
+
+
+# ------------------------------------------------------------------------------
+# Previous implementation, one GeoSeries per hexagon (create_fishnet's hex branch)
+# ------------------------------------------------------------------------------
+footprint = box(*bounds)
+start = time()
+grid = []
+xmin, ymin, xmax, ymax = box(*bounds).bounds
+dx = cell_width * 3/4
+dy = cell_height * math.sqrt(3)/2
+row = 0
+x = xmin
+while x < xmax + cell_width:
+    y = ymin - (dy / 2 if row % 2 else 0)
+    while y < ymax + cell_height:
+        cx = x
+        cy = y
+        hexagon = create_hexagon(cx, cy, cell_width / 2)
+        if hexagon.intersects(footprint):
+            grid.append(hexagon)
+        y += dy
+    x += dx
+    row += 1
+loop_time = time() - start
+print(f"create_hexagon: {len(grid)} hexagons in {round(loop_time, 2)} seconds")
+overlap = shapely.area(grid).sum() - shapely.union_all(grid).area
+print(f"Overlapping area, rows spaced by a {cell_height} cell height: {round(overlap, 4)} square meters")
+
+
+# ------------------------------------------------------------------------------
+# Vectorized implementation
+# ------------------------------------------------------------------------------
+start = time()
+cells = hexagon_grid(bounds, cell_width)
+cells = cells[shapely.intersects(cells, footprint)]
+grid_time = time() - start
+print(f"hexagon_grid: {len(cells)} hexagons in {round(grid_time, 2)} seconds")
+print(f"\nSpeed up: {round(loop_time / max(grid_time, 1e-6), 1)}x")
+
+
+# ------------------------------------------------------------------------------
+# Confirm the hexagons tile the scene
+# ------------------------------------------------------------------------------
+overlap = shapely.area(cells).sum() - shapely.union_all(cells).area
+print(f"Overlapping area: {round(overlap, 4)} square meters")
+print(f"Uncovered area: {round(shapely.box(*bounds).difference(shapely.union_all(cells)).area, 4)} square meters")
@@ -6,8 +6,14 @@
 
 # Import Libraries
 import os
+import sys
 import sqlite3
 
+project_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(project_dir)
+
+from animal.etl import ETL_INDEXES, ETL_SOURCE_VIEW, etl_triggers
+
 
 # Define functions
 def initialize_spatialite(db):
@@ -433,9 +439,9 @@ def create_etl(db):
             table for further work within the ANIMAL application.
 
         FIELDS: AOI ID, ID, Vendor ID, Entity ID, Vendor, Satellite
-            Pixel Size X, Pixel Size Y, Date, Publish Date, Geometry
-            Sea State Qualitative, Sea State Quantitative, and
-            Sharability.
+            Pixel Size X, Pixel Size Y, Date, Publish Date, Geometry,
+            Geom (spatially indexed Geometry), Sea State Qualitative,
+            Sea State Quantitative, and Sharability.
             
         DB - Path to database
     """
@@ -447,65 +453,21 @@ def create_etl(db):
         
         c = conn.cursor()
         
-        c.execute('''
-            CREATE TABLE etl AS    
-                SELECT 'EE' AS table_name,
-                       e.aoi_id_id AS aoi_id,
-                       e.catalog_id AS id,
-                       e.vendor_id AS vendor_id,
-                       e.entity_id AS entity_id,
-                       e.vendor as vendor,
-                       e.satellite AS platform,
-                       e.pixel_size_x AS pixel_size_x,
-                       e.pixel_size_y AS pixel_size_y,
-                       e.acquisition_date AS date,
-                       Date(e.publish_date) AS publish_date,
-                       AsText(e.bounds) as geometry
-                   FROM animal_earthexplorer e
-                
-                UNION
-                
-                SELECT 'GEGD' AS table_name,
-                       g.aoi_id_id AS aoi_id,
-                       g.legacy_id AS id,
-                       NULL AS vendor_id,
-                       NULL AS entity_id,
-                       g.company_name as vendor,
-                       g.source AS platform,
-                       g.per_pixel_x AS pixel_size_x,
-                       g.per_pixel_y AS pixel_size_y,
-                       Date(g.acquisition_date) AS date,
-                       NULL AS publish_date,
-                       AsText(g.geometry) AS geometry
-                   FROM animal_geointdiscovery g
-                LEFT JOIN animal_earthexplorer e ON g.legacy_id = e.catalog_id
-                    WHERE
-                        e.catalog_id IS NULL
-                
-                UNION
-        
-                SELECT 'MGP' AS table_name,
-                       m.aoi_id_id AS aoi_id,
-                       m.id AS id,
-                       NULL AS vendor_id,
-                       NULL AS entity_id,
-                       "Maxar" AS vendor,
-                       m.platform AS platform,
-                       m.gsd AS pixel_size_x,
-                       m.gsd AS pixel_size_y,
-                       Date(datetime) AS date,
-                       NULL AS publish_date,
-                       AsText(m.bbox) AS geometry
-                   FROM animal_maxargeospatialplatform m
-                LEFT JOIN animal_earthexplorer e ON m.id = e.catalog_id
-                LEFT JOIN animal_geointdiscovery g ON m.id = g.legacy_id
-                    WHERE
-                        e.catalog_id IS NULL AND g.legacy_id IS NULL;
-        ''')
+        # ETL SOURCE defines the ETL table's contents, which triggers keep it in step with
+        c.execute(ETL_SOURCE_VIEW)
+        c.execute('''CREATE TABLE etl AS SELECT * FROM etl_source''')
         
         c.execute('''ALTER TABLE etl ADD COLUMN sea_state_qual VARVHAR(15)''')
         c.execute('''ALTER TABLE etl ADD COLUMN sea_state_quant NUMERIC(2, 2)''')
         c.execute('''ALTER TABLE etl ADD COLUMN shareable VARVHAR(3)''')
+
+        # Spatially indexed copy of the footprint's WKT for AOI filtering
+        c.execute('''SELECT AddGeometryColumn('etl', 'geom', 4326, 'GEOMETRY', 'XY')''')
+        c.execute('''UPDATE etl SET geom = GeomFromText(geometry, 4326)''')
+        c.execute('''SELECT CreateSpatialIndex('etl', 'geom')''')
+
+        for index in ETL_INDEXES:
+            c.execute(index)
         
         conn.commit()
         conn.close()
@@ -517,127 +479,48 @@ def create_etl(db):
 
 def create_etl_triggers(db):
     """ When provided with a path to a SpatiaLite database, create the
-            ETL table triggers.
+            ETL table triggers. These refresh the ETL rows of a catalog id
+            after every insert, update, and delete on the EE, GEGD, and
+            MGP tables (see animal.etl).
             
         DB - Path to database
     """
 
-    try:
-        conn = sqlite3.connect(db)
-        conn.enable_load_extension(True)
-        conn.execute("SELECT load_extension('mod_spatialite')")
-        
-        c = conn.cursor()
-        
-        c.execute('''
-            CREATE TRIGGER update_etl_after_ee_insert
-                AFTER INSERT ON animal_earthexplorer
-                    BEGIN
-                        INSERT INTO etl (table_name, aoi_id, id, vendor_id, entity_id, vendor, platform, pixel_size_x, pixel_size_y, date, publish_date, geometry)
-                        SELECT
-                           'EE' AS table_name,
-                           NEW.aoi_id_id AS aoi_id,
-                           NEW.catalog_id AS id,
-                           NEW.vendor_id AS vendor_id,
-                           NEW.entity_id AS entity_id,
-                           NEW.vendor as vendor,
-                           NEW.satellite AS platform,
-                           NEW.pixel_size_x AS pixel_size_x,
-                           NEW.pixel_size_y AS pixel_size_y,
-                           NEW.acquisition_date AS date,
-                           Date(NEW.publish_date) AS publish_date,
-                           AsText(NEW.bounds) as geometry;
-        
-                        INSERT INTO trigger_log (trigger_name, action, log_message)
-                        VALUES ('update_etl_after_ee_insert', 'INSERT', 'trigger fired after INSERT on animal_earthexplorer');
-                    END;
-        ''')
-        
-        conn.commit()
-        conn.close()
-
-        print("Successfully created table ETL after EE insert")
+    conn = sqlite3.connect(db)
+    conn.enable_load_extension(True)
+    conn.execute("SELECT load_extension('mod_spatialite')")
     
-    except Exception as e:
-        print(f"Failed to create ETL after Earth Explorer insert trigger with exception: {e}")
+    c = conn.cursor()
 
-    try:
-        conn = sqlite3.connect(db)
-        conn.enable_load_extension(True)
-        conn.execute("SELECT load_extension('mod_spatialite')")
-        
-        c = conn.cursor()
-        
-        c.execute('''
-            CREATE TRIGGER update_etl_after_gegd_insert
-                AFTER INSERT ON animal_geointdiscovery
+    # Keep the spatially indexed geometry in step with the WKT however rows arrive
+    triggers = dict(etl_triggers())
+    triggers['etl_geom_after_insert'] = '''
+        CREATE TRIGGER etl_geom_after_insert
+            AFTER INSERT ON etl
+                WHEN NEW.geometry IS NOT NULL
                     BEGIN
-                        INSERT INTO etl (table_name, aoi_id, id, vendor_id, entity_id, vendor, platform, pixel_size_x, pixel_size_y, date, publish_date, geometry)
-                        SELECT
-                           'GEGD' AS table_name,
-                           NEW.aoi_id_id AS aoi_id,
-                           NEW.legacy_id AS id,
-                           NULL AS vendor_id,
-                           NULL AS entity_id,
-                           NEW.company_name as vendor,
-                           NEW.source AS platform,
-                           NEW.per_pixel_x AS pixel_size_x,
-                           NEW.per_pixel_y AS pixel_size_y,
-                           Date(NEW.acquisition_date) AS date,
-                           NULL AS publish_date,
-                           AsText(NEW.geometry) as geometry;
-        
-                        INSERT INTO trigger_log (trigger_name, action, log_message)
-                        VALUES ('update_etl_after_gegd_insert', 'INSERT', 'trigger fired after INSERT on animal_geointdiscovery');
+                        UPDATE etl SET geom = GeomFromText(NEW.geometry, 4326) WHERE ROWID = NEW.ROWID;
                     END;
-        ''')
-        
-        conn.commit()
-        conn.close()
-
-        print("Successfully created table ETL after GEGD insert")
-
-    except Exception as e:
-        print(f"Failed to create ETL after Global Enhanced GEOINT Delivery insert trigger with exception: {e}")
-
-    try:
-        conn = sqlite3.connect(db)
-        conn.enable_load_extension(True)
-        conn.execute("SELECT load_extension('mod_spatialite')")
-        
-        c = conn.cursor()
-        
-        c.execute('''
-            CREATE TRIGGER update_etl_after_mgp_insert
-                AFTER INSERT ON animal_maxargeospatialplatform
+    '''
+    triggers['etl_geom_after_update'] = '''
+        CREATE TRIGGER etl_geom_after_update
+            AFTER UPDATE OF geometry ON etl
                     BEGIN
-                        INSERT INTO etl (table_name, aoi_id, id, vendor_id, entity_id, vendor, platform, pixel_size_x, pixel_size_y, date, publish_date, geometry)
-                        SELECT
-                           'MGP' AS table_name,
-                           NEW.aoi_id_id AS aoi_id,
-                           NEW.id AS id,
-                           NULL AS vendor_id,
-                           NULL AS entity_id,
-                           "Maxar" AS vendor,
-                           NEW.platform AS platform,
-                           NEW.gsd AS pixel_size_x,
-                           NEW.gsd AS pixel_size_y,
-                           Date(NEW.datetime) AS date,
-                           NULL AS publish_date,
-                           AsText(NEW.bbox) as geometry;
-        
-                        INSERT INTO trigger_log (trigger_name, action, log_message)
-                        VALUES ('update_etl_after_mgp_insert', 'INSERT', 'trigger fired after INSERT on animal_maxargeospatialplatform');
+                        UPDATE etl SET geom = GeomFromText(NEW.geometry, 4326) WHERE ROWID = NEW.ROWID;
                     END;
-        ''')
-        
-        conn.commit()
-        conn.close()
+    '''
+
+    for name, trigger in triggers.items():
+        try:
+            c.execute(trigger)
+            conn.commit()
 
-        print("Successfully created table ETL after MGP insert")
+            print(f"Successfully created trigger {name}")
         
-    except Exception as e:
-        print(f"Failed to create ETL after Maxar Geospatial Platform insert trigger with exception: {e}")
+        except Exception as e:
+            print(f"Failed to create trigger {name} with exception: {e}")
+
+    conn.close()
 
 def create_poitnsofinterest(db):
     """ When provided with a path to a SpatiaLite database, create the
@@ -16,12 +16,10 @@
 import os
 import sys
 import django
-import asyncio
 import importlib
 from time import time
 from glob import glob
 from pathlib import Path
-from asgiref.sync import sync_to_async
 
 # Set PROJ_LIB environment variable to fix projection issues
 os.environ['PROJ_LIB'] = '/opt/conda/envs/gaia/share/proj'
@@ -36,7 +34,7 @@ importlib.reload(utils.spatial_ops)
 os.environ['DJANGO_SETTINGS_MODULE'] = 'gaia.settings'
 django.setup()
 
-from animal.models import Fishnet as FN
+from django.core.management import call_command
 
 
 # ------------------------------------------------------------------------------
@@ -56,24 +54,7 @@ fishnet_gdf = utils.spatial_ops.create_fishnet(test_cog)
 # ------------------------------------------------------------------------------
 # Import fishnet into the SpatiaLite database
 # ------------------------------------------------------------------------------
-def import_fishnet(gdf):
-    """Synchronous import fishnet cells."""
-    for index, row in gdf.iterrows():
-        print(f"\nindex: {index}, row: {row}")
-        FN.objects.create(
-            vendor_id=row['vendor_id'],
-            cell=row['geometry'].wkt
-        )
-
-async def import_fishnet_async(gdf):
-    await sync_to_async(import_fishnet, thread_sensitive=True)(gdf)
-
 start = time()
-
-async def run_all():
-    await import_fishnet_async(fishnet_gdf)
-
-asyncio.run(run_all())
-
+call_command('build_fishnet', *test_cog)
 end = time()
 print(f"\n Loaded in {round(end - start, 2)} seconds.")
@@ -57,12 +57,20 @@ INSTALLED_APPS = [
 ]
 
 # Django Q Cluster
+#      With PROCESSING_ASYNC, the processing page queues imagery pairs for a qcluster
+#      worker (see animal.tasks.process_imagery), opposed to processing them within
+#      the request, each task running for up to PROCESSING_TASK_TIMEOUT seconds. The
+#      broker's retry must outlast it, or running tasks are handed out again
+PROCESSING_ASYNC = os.getenv('PROCESSING_ASYNC', 'False') == 'True'
+PROCESSING_TASK_TIMEOUT = int(os.getenv('PROCESSING_TASK_TIMEOUT', 6 * 3600))
+if PROCESSING_ASYNC and 'django_q' not in INSTALLED_APPS:
+    INSTALLED_APPS.append('django_q')
 
 Q_CLUSTER = {
     'name': 'DjangoORM',
     'workers': 1,
     'orm': 'default',
-    'retry': 3600,
+    'retry': max(3600, PROCESSING_TASK_TIMEOUT + 600),
     'timeout': 900,
     'catch_up': True,
     'sync': False,
@@ -246,6 +254,50 @@ AZURE_STORAGE_ACCOUNT_NAME = 'gaianoaastorage'
 AZURE_STORAGE_ACCOUNT_KEY = secrets['AZURE_KEY']
 AZURE_CONTAINER_NAME = 'data'
 
+# Processing details
+#      COG_PROFILE is a key of utils.raster_ops.COG_PROFILES (compare them with
+#      `python manage.py benchmark_cog --input-file <scene>`). COG_CREATION_OPTIONS
+#      override the profile (e.g., {'BLOCKSIZE': 256, 'OVERVIEW_COUNT': 6, 'NUM_THREADS': 4})
+COG_PROFILE = 'deflate'
+COG_CREATION_OPTIONS = {}
+#      Keyword arguments for animal.utils.calibrate_images
+#      (e.g., {'max_workers': 2, 'gdal_num_threads': 4, 'gdal_cachemax': 2048})
+CALIBRATION_OPTIONS = {}
+#      DEM images are orthorectified against, relative to the WGS84 ellipsoid (e.g., a VRT
+#      of a global DEM). Clipped DEMs are cached in DEM_CACHE_DIR (see utils.pgc_wrapper)
+CALIBRATION_DEM = os.getenv('CALIBRATION_DEM')
+#      Worker processes searching for interesting points, or 1 to search in-process
+#      (None uses the CPU count; compare with dev_tools/benchmark_detection.py)
+DETECTION_WORKERS = None
+#      Interesting point catalog format, 'parquet' (GeoParquet) or 'geojson'
+POI_CATALOG_FORMAT = 'parquet'
+#      Local working directory for downloads and intermediate artifacts, and the
+#      bytes the processing stages of each worker process may hold on that volume
+#      at once. Budgets are per process, so divide the volume between the processes
+WORKSPACE_ROOT = os.getenv('WORKSPACE_ROOT', os.path.join(BASE_DIR.parent, 'data'))
+WORKSPACE_DISK_BUDGET = int(os.getenv('WORKSPACE_DISK_BUDGET', 100 * 1024 ** 3))
+#      Seconds a stage waits for other jobs to free the disk budget before its job fails
+WORKSPACE_RESERVE_TIMEOUT = int(os.getenv('WORKSPACE_RESERVE_TIMEOUT', 3600))
+#      Keep the workspace of a failed job so it can resume instead of downloading again
+WORKSPACE_KEEP_FAILED = os.getenv('WORKSPACE_KEEP_FAILED', 'False') == 'True'
+#      ETL search results per page on the processing page, and the most returned per search
+ETL_SEARCH_PAGE_SIZE = 100
+ETL_SEARCH_LIMIT = 1000
+#      Seconds collection page search results are cached for registration
+COLLECTION_SEARCH_TTL = 3600
+
+# Cache shared by every gunicorn and django-q worker process on this host, so a
+#      search cached by one worker can be registered through another
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR.parent, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    }
+}
+
 
 # Avoid CSRF verfication failures
 CSRF_TRUSTED_ORIGINS = [
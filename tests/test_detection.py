@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from osgeo import gdal
+
+from utils.detection import box_sum, detect_tile
+
+
+def brute_force_box_sum(values, window):
+    r = window // 2
+    height, width = values.shape
+    return np.array([[values[max(y - r, 0):y + r + 1, max(x - r, 0):x + r + 1].sum()
+                      for x in range(width)]
+                     for y in range(height)])
+
+
+def mem_raster(brightness):
+    """ A three band, in-memory raster of BRIGHTNESS in every band. """
+    height, width = brightness.shape
+    ds = gdal.GetDriverByName('MEM').Create('', width, height, 3, gdal.GDT_Byte)
+    ds.SetGeoTransform((0, 1, 0, 0, 0, -1))
+    for band in range(1, 4):
+        ds.GetRasterBand(band).WriteArray(brightness)
+    return ds
+
+
+@pytest.mark.parametrize('window', [1, 3, 4, 5, 11, 101])
+def test_box_sum_matches_brute_force(window):
+    values = np.random.default_rng(0).uniform(0, 255, (17, 23))
+    np.testing.assert_allclose(box_sum(values, window), brute_force_box_sum(values, window))
+
+
+def test_box_sum_counts_valid_pixels():
+    valid = np.random.default_rng(1).uniform(size=(12, 9)) > 0.3
+    np.testing.assert_array_equal(box_sum(valid, 5), brute_force_box_sum(valid.astype(int), 5))
+
+
+def test_point_straddling_tiles_is_found_once_by_the_tile_owning_its_center():
+    brightness = np.full((32, 64), 100, dtype=np.uint8)
+    brightness[15:18, 31:34] = 200  # Centered on column 32, the second tile's first column
+    ds = mem_raster(brightness)
+
+    window, halo = 9, 4
+    left = detect_tile((ds, (0, 0, 32, 32), 20.0, window, halo, None))
+    right = detect_tile((ds, (32, 0, 32, 32), 20.0, window, halo, None))
+
+    assert left.shape[1] == 0
+    assert right.shape[1] == 1
+    col, row, pixels, deviation = right[:, 0]
+    assert (col, row, pixels) == (32, 16, 9)
+    assert deviation > 20
+
+
+def test_halo_completes_windows_at_tile_edges():
+    brightness = np.full((32, 64), 100, dtype=np.uint8)
+    brightness[10:13, 20:23] = 200
+    ds = mem_raster(brightness)
+
+    # Tiles covering the whole raster find the same points as one tile over it
+    whole = detect_tile((ds, (0, 0, 64, 32), 20.0, 9, 4, None))
+    tiled = np.hstack([detect_tile((ds, (x, 0, 16, 32), 20.0, 9, 4, None)) for x in range(0, 64, 16)])
+    np.testing.assert_array_equal(whole, tiled)
@@ -0,0 +1,28 @@
+import pytest
+import shapely
+
+from utils.spatial_ops import hexagon_grid
+
+
+@pytest.mark.parametrize('bounds, cell_width', [
+    ((0, 0, 17000, 14000), 600),
+    ((-8237642.3, 4970241.3, -8231110.9, 4976022.8), 250),
+    ((10, 20, 11, 21), 3),
+])
+def test_hexagon_grid_covers_bounds_without_overlap(bounds, cell_width):
+    cells = hexagon_grid(bounds, cell_width)
+    union = shapely.union_all(cells)
+    tolerance = 1e-6 * cell_width ** 2 * len(cells)
+
+    assert shapely.box(*bounds).difference(union).area <= tolerance
+    assert shapely.area(cells).sum() - union.area <= tolerance
+
+
+def test_hexagon_grid_cells_are_regular_hexagons_of_cell_width():
+    cell_width = 600
+    cells = hexagon_grid((0, 0, 5000, 5000), cell_width)
+
+    xmin, ymin, xmax, ymax = shapely.bounds(cells).T
+    assert xmax - xmin == pytest.approx(cell_width)
+    assert ymax - ymin == pytest.approx(3 ** 0.5 * cell_width / 2)
+    assert shapely.area(cells) == pytest.approx(3 * 3 ** 0.5 / 8 * cell_width ** 2)
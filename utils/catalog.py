@@ -0,0 +1,148 @@
+# ------------------------------------------------------------------------------
+# ----- catalog.py -------------------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Parses EarthExplorer, GEOINT Discovery, and Maxar Geospatial
+#              Platform search responses into GeoDataFrames, shared by the
+#              collection page and the dev_tools scripts
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries
+# ------------------------------------------------------------------------------
+import numpy as np
+import shapely
+import geopandas as gpd
+
+
+# ------------------------------------------------------------------------------
+# Response fields
+# ------------------------------------------------------------------------------
+# GEOINT Discovery column names and the feature properties they are read from
+GEGD_PROPERTIES = {
+    'legacy_id': 'legacyId',
+    'factory_order_number': 'factoryOrderNumber',
+    'acquisition_date': 'acquisitionDate',
+    'source': 'source',
+    'source_unit': 'sourceUnit',
+    'product_type': 'productType',
+    'cloud_cover': 'cloudCover',
+    'off_nadir_angle': 'offNadirAngle',
+    'sun_elevation': 'sunElevation',
+    'sun_azimuth': 'sunAzimuth',
+    'ground_sample_distance': 'groundSampleDistance',
+    'data_layer': 'dataLayer',
+    'legacy_description': 'legacyDescription',
+    'color_band_order': 'colorBandOrder',
+    'asset_name': 'assetName',
+    'per_pixel_x': 'perPixelX',
+    'per_pixel_y': 'perPixelY',
+    'crs_from_pixels': 'crsFromPixels',
+    'age_days': 'ageDays',
+    'ingest_date': 'ingestDate',
+    'company_name': 'companyName',
+    'copyright': 'copyright',
+    'niirs': 'niirs',
+}
+
+# Maxar Geospatial Platform column names and the feature properties they are read from
+MGP_PROPERTIES = {
+    'platform': 'platform',
+    'instruments': 'instruments',
+    'gsd': 'gsd',
+    'pan_resolution_avg': 'pan_resolution_avg',
+    'multi_resolution_avg': 'multi_resolution_avg',
+    'datetime': 'datetime',
+    'off_nadir': 'view:off_nadir',
+    'azimuth': 'view:azimuth',
+    'sun_azimuth': 'view:sun_azimuth',
+    'sun_elevation': 'view:sun_elevation',
+}
+
+
+# ------------------------------------------------------------------------------
+# Parsers
+# ------------------------------------------------------------------------------
+def ee_gdf(results: list, aoi_id) -> gpd.GeoDataFrame:
+    """ Parses EarthExplorer scene-search results into columns in one pass
+            and builds the GeoDataFrame once, opposed to appending a row
+            per result.
+
+        Columns are the results' metadata field names, less the corner and
+            center coordinates, followed by thumbnail, publish_date, bounds
+            (the geometry), and aoi.
+
+        RESULTS - The response's ['data']['results']
+        AOI ID - Area of interest the search was made over
+    """
+    names = [field['fieldName'] for field in results[0]['metadata']] if results else []
+    columns = {name: [] for name in names}
+    thumbnails, publish_dates, bounds = [], [], []
+
+    for result in results:
+        # Looked up by name, so a result missing a field is not misaligned
+        values = {field['fieldName']: field['value'] for field in result['metadata']}
+        for name in names:
+            columns[name].append(values.get(name))
+        thumbnails.append(result['browse'][0]['thumbnailPath'] if result.get('browse') else None)
+        publish_dates.append(result.get('publishDate'))
+        bounds.append(shapely.Polygon(result['spatialBounds']['coordinates'][0]))
+
+    drop_columns = [name for name in names if "Corner" in name] + ['Center Latitude', 'Center Longitude']
+    columns = {name: values for name, values in columns.items() if name not in drop_columns}
+    columns.update({'thumbnail': thumbnails, 'publish_date': publish_dates, 'bounds': bounds})
+
+    gdf = gpd.GeoDataFrame(columns, geometry='bounds', crs="EPSG:4326")
+    gdf['aoi'] = aoi_id
+    return gdf
+
+
+def gegd_gdf(features: list, aoi_id) -> gpd.GeoDataFrame:
+    """ Parses GEOINT Discovery WFS features into columns in one pass and
+            builds the GeoDataFrame once. Properties missing from a feature
+            are left empty. Coordinates are returned latitude first and
+            are swapped.
+
+        Columns are id, those of GEGD_PROPERTIES, geometry, and aoi_id.
+
+        FEATURES - The response's ['features']
+        AOI ID - Area of interest the search was made over
+    """
+    columns = {'id': [feature['id'] for feature in features]}
+    for name, key in GEGD_PROPERTIES.items():
+        columns[name] = [feature['properties'].get(key) for feature in features]
+    columns['geometry'] = [shapely.Polygon(np.asarray(feature['geometry']['coordinates'][0])[:, ::-1])
+                           for feature in features]
+
+    gdf = gpd.GeoDataFrame(columns, geometry='geometry', crs="EPSG:4326")
+    gdf['aoi_id'] = aoi_id
+    return gdf
+
+
+def mgp_gdf(features: list, aoi_id, geometry: str = 'geometry') -> gpd.GeoDataFrame:
+    """ Parses Maxar Geospatial Platform STAC features into columns in one
+            pass and builds the GeoDataFrame once, with every bounding box
+            made in a single vectorized call.
+
+        Columns are id, those of MGP_PROPERTIES, the bounding box, and aoi_id.
+
+        FEATURES - The response's ['features']
+        AOI ID - Area of interest the search was made over
+        GEOMETRY - Name of the bounding box column (Default: geometry)
+    """
+    columns = {'id': [feature['id'] for feature in features]}
+    for name, key in MGP_PROPERTIES.items():
+        columns[name] = [feature['properties'].get(key) for feature in features]
+    columns['instruments'] = [', '.join(instruments) if instruments else None for instruments in columns['instruments']]
+
+    bboxes = np.array([feature['bbox'] for feature in features], dtype=float).reshape(-1, 4)
+    columns[geometry] = shapely.box(bboxes[:, 0], bboxes[:, 1], bboxes[:, 2], bboxes[:, 3])
+
+    gdf = gpd.GeoDataFrame(columns, geometry=geometry, crs="EPSG:4326")
+    gdf['aoi_id'] = aoi_id
+    return gdf
@@ -0,0 +1,255 @@
+# ------------------------------------------------------------------------------
+# ----- detection.py -----------------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Contains the in-process, tiled interesting point detection
+#              engine behind the generate_points management command
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries
+# ------------------------------------------------------------------------------
+import os
+import multiprocessing
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import ndimage
+from osgeo import gdal, osr
+import geopandas as gpd
+from utils.raster_ops import CoverageMask
+
+gdal.UseExceptions()
+
+
+# ------------------------------------------------------------------------------
+# Defaults
+# ------------------------------------------------------------------------------
+METHODS = ['big_window']
+
+# Pixels, per side, of the window a pixel is compared against
+WINDOW_SIZE = 101
+
+# Target tile size in pixels, rounded up to a multiple of the COG's block size
+TILE_SIZE = 2048
+
+
+# ------------------------------------------------------------------------------
+# Tiling
+# ------------------------------------------------------------------------------
+def plan_tiles(width: int, height: int, block_size: tuple, tile_size: int = TILE_SIZE) -> list:
+    """ Splits a raster into tiles aligned to its internal blocks, so every
+            windowed read touches whole COG tiles.
+
+        WIDTH, HEIGHT - Raster size in pixels
+        BLOCK SIZE - The raster's block width and height
+        TILE SIZE - Target tile size, rounded up to whole blocks
+
+        Returns a list of (x offset, y offset, x size, y size).
+    """
+    tile_x = -(-tile_size // block_size[0]) * block_size[0]
+    tile_y = -(-tile_size // block_size[1]) * block_size[1]
+    return [(x, y, min(tile_x, width - x), min(tile_y, height - y))
+            for y in range(0, height, tile_y)
+            for x in range(0, width, tile_x)]
+
+
+def read_window(ds: gdal.Dataset, xoff: int, yoff: int, xsize: int, ysize: int, halo: int):
+    """ Reads a tile, plus a halo of surrounding pixels clipped to the raster,
+            as a single band brightness image and its valid (non-zero) mask.
+
+        Returns the brightness, the valid mask, and the tile's offset within
+            the padded read.
+    """
+    x0, y0 = max(xoff - halo, 0), max(yoff - halo, 0)
+    x1, y1 = min(xoff + xsize + halo, ds.RasterXSize), min(yoff + ysize + halo, ds.RasterYSize)
+
+    bands = min(ds.RasterCount, 3)
+    data = ds.ReadAsArray(x0, y0, x1 - x0, y1 - y0, band_list=list(range(1, bands + 1)))
+    data = data.reshape(bands, y1 - y0, x1 - x0).astype(np.float32)
+
+    valid = np.any(data > 0, axis=0)
+    return data.mean(axis=0), valid, (xoff - x0, yoff - y0)
+
+
+# ------------------------------------------------------------------------------
+# Sliding window statistics
+# ------------------------------------------------------------------------------
+def box_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """ Sums every WINDOW by WINDOW neighbourhood, clipped at the array's
+            edges, from an integral image (summed-area table) so each sum
+            takes four lookups regardless of the window's size.
+    """
+    height, width = values.shape
+    integral = np.zeros((height + 1, width + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+
+    r = window // 2
+    y0, y1 = np.clip(np.arange(height) - r, 0, height), np.clip(np.arange(height) + r + 1, 0, height)
+    x0, x1 = np.clip(np.arange(width) - r, 0, width), np.clip(np.arange(width) + r + 1, 0, width)
+
+    return (integral[np.ix_(y1, x1)] - integral[np.ix_(y0, x1)]
+            - integral[np.ix_(y1, x0)] + integral[np.ix_(y0, x0)])
+
+
+def local_stats(values: np.ndarray, valid: np.ndarray, window: int):
+    """ Local mean and standard deviation of the valid pixels within the
+            window around every pixel, in O(1) per pixel from running sums.
+
+        Returns the local mean and standard deviation as float32 arrays.
+    """
+    values = np.where(valid, values, 0).astype(np.float64)
+    counts = box_sum(valid, window)
+    sums = box_sum(values, window)
+    squares = box_sum(values * values, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(counts > 0, sums / counts, 0)
+        variance = np.where(counts > 0, squares / counts - mean * mean, 0)
+
+    return mean.astype(np.float32), np.sqrt(np.maximum(variance, 0)).astype(np.float32)
+
+
+# ------------------------------------------------------------------------------
+# Detection methods
+# ------------------------------------------------------------------------------
+def big_window(brightness: np.ndarray, valid: np.ndarray, difference: float,
+    window: int = WINDOW_SIZE, sigma: float = None
+    ):
+    """ Flags pixels that differ from the mean of the big window around them by
+            more than DIFFERENCE and, if given, by more than SIGMA local
+            standard deviations. Nodata pixels are excluded from the
+            window statistics.
+
+        Returns the candidate mask and each pixel's absolute deviation.
+    """
+    mean, std = local_stats(brightness, valid, window)
+
+    deviation = np.abs(brightness - mean)
+    candidates = valid & (deviation > difference)
+    if sigma is not None:
+        candidates &= deviation > sigma * std
+    return candidates, deviation
+
+
+def detect_tile(args):
+    """ Detects interesting points within one tile. Run in worker processes,
+            each opening the raster by path, so only the points found are
+            returned to the parent, or in-process given the open dataset.
+
+        Returns arrays of the points' pixel columns, rows, pixel counts, and
+            maximum deviation.
+    """
+    src, (xoff, yoff, xsize, ysize), difference, window, halo, sigma = args
+
+    ds = gdal.Open(src, gdal.GA_ReadOnly) if isinstance(src, str) else src
+    brightness, valid, (cx, cy) = read_window(ds, xoff, yoff, xsize, ysize, halo)
+    ds = None
+
+    candidates, deviation = big_window(brightness, valid, difference, window, sigma)
+
+    labels, count = ndimage.label(candidates, structure=np.ones((3, 3)))
+    if count == 0:
+        return np.empty((4, 0))
+
+    index = np.arange(1, count + 1)
+    rows, cols = np.array(ndimage.center_of_mass(candidates, labels, index)).T
+    pixels = ndimage.sum_labels(candidates, labels, index)
+    deviations = ndimage.maximum(deviation, labels, index)
+
+    # Keep points centered in this tile's core; those in its halo belong to a neighbour
+    core = (cols >= cx) & (cols < cx + xsize) & (rows >= cy) & (rows < cy + ysize)
+    return np.vstack([cols[core] - cx + xoff, rows[core] - cy + yoff, pixels[core], deviations[core]])
+
+
+def detect_interesting_points(src, method: str = 'big_window', difference: float = 20,
+    window: int = WINDOW_SIZE, tile_size: int = TILE_SIZE, halo: int = None,
+    sigma: float = None, mask: str = 'valid', max_workers: int = None
+    ) -> gpd.GeoDataFrame:
+    """ Tiled interesting point detection. The raster is split into tiles
+            aligned to its COG blocks which are processed across a pool of
+            worker processes, each reading only its tile and a halo.
+
+        Peak memory is set by the tile size, plus its halo, and the number of
+            workers, independent of the scene's size.
+
+        Workers reopen the raster by path. For a pansharpened VRT (see
+            BUILD COG) each worker's windowed read pansharpens only its tile
+            and halo from the pan and multispectral windows beneath it, so
+            pansharpening is split across the workers, not repeated by each.
+            The extra work is the halo, about 10% with the default tile and
+            window, and each worker's start up, about a second per spawned
+            process. Detection itself is CPU bound, about 0.8 seconds per
+            default tile on one core, so the pool pays off beyond a few
+            tiles. With one worker, or one tile, tiles are searched
+            in-process. Compare with dev_tools/benchmark_detection.py.
+
+        SRC - A path to, or an open, GDAL dataset (e.g., a pansharpened COG)
+        METHOD - Detection method, one of METHODS (Default: big_window)
+        DIFFERENCE - Brightness difference from the local mean that makes
+            a pixel interesting
+        WINDOW - Big window size in pixels
+        TILE SIZE - Target tile size in pixels
+        HALO - Pixels read around each tile so windows at its edges are
+            complete (Default: half the window, the minimum)
+        SIGMA - Optionally, local standard deviations a pixel must also
+            differ from the local mean by
+        MASK - Skip tiles without 'valid' or 'water' pixels according to a
+            COG overview pre-pass (see CoverageMask), or None to search all
+        MAX WORKERS - Worker processes, or 1 to search in-process
+            (Default: CPU count)
+
+        Returns a GeoDataFrame of points with their id, area (in squared
+            map units), deviation, and EPSG code.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown detection method {method}. Choose from: {', '.join(METHODS)}")
+    halo = window // 2 if halo is None else halo
+    if halo < window // 2:
+        raise ValueError(f"A halo of {halo} pixels is smaller than half the {window} pixel window")
+
+    ds = gdal.Open(src, gdal.GA_ReadOnly) if isinstance(src, str) else src
+    path = ds.GetDescription()
+    gt = ds.GetGeoTransform()
+    srs = osr.SpatialReference(wkt=ds.GetProjection())
+    srs.AutoIdentifyEPSG()
+    epsg = srs.GetAuthorityCode(None)
+
+    tiles = plan_tiles(ds.RasterXSize, ds.RasterYSize, ds.GetRasterBand(1).GetBlockSize(), tile_size)
+    if mask:
+        start = time()
+        coverage = CoverageMask(ds, mode=mask)
+        planned = len(tiles)
+        tiles = [tile for tile in tiles if coverage.any_in_window(*tile)]
+        print(f"\n It took: {round(time() - start,2)} seconds to mask {path}, skipping {planned - len(tiles)} "
+              f"of {planned} tiles without {mask} pixels \n")
+
+    start = time()
+    workers = min(max_workers or os.cpu_count() or 1, len(tiles))
+    if workers <= 1:
+        results = [detect_tile((ds, tile, float(difference), window, halo, sigma)) for tile in tiles]
+    else:
+        # Spawned, opposed to forked, workers so threads of the calling process are not copied
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = list(executor.map(detect_tile, [(path, tile, float(difference), window, halo, sigma) for tile in tiles]))
+    print(f"\n It took: {round(time() - start,2)} seconds to search {len(tiles)} tiles of {path} "
+          f"with {max(workers, 1)} worker(s) \n")
+
+    cols, rows, pixels, deviations = np.hstack(results) if results else np.empty((4, 0))
+
+    # Pixel centers to map coordinates
+    x = gt[0] + (cols + 0.5) * gt[1] + (rows + 0.5) * gt[2]
+    y = gt[3] + (cols + 0.5) * gt[4] + (rows + 0.5) * gt[5]
+
+    return gpd.GeoDataFrame({
+        'id': np.arange(len(x)),
+        'area': pixels * abs(gt[1] * gt[5]),
+        'deviation': deviations,
+        'epsg_code': str(epsg) if epsg else None,
+    }, geometry=gpd.points_from_xy(x, y), crs=f"EPSG:{epsg}" if epsg else ds.GetProjection())
@@ -16,8 +16,11 @@
 # ----------------------------
 # Import libraries, find third-party exript
 # ----------------------------
+import os
 import sys
+import math
 from pathlib import Path
+from osgeo import gdal
 
 try:
     base_dir = Path(__file__).resolve().parent.parent
@@ -29,24 +32,113 @@ external_dir = base_dir / "external" / "imagery_utils"
 print(external_dir)
 sys.path.append(str(external_dir))
 
+gdal.UseExceptions()
+
+
+# ----------------------------
+# DEM cache
+# ----------------------------
+# Prepared DEMs live on disk between runs, keyed by (AOI, UTM EPSG code), so
+#      every scene over the same AOI is orthorectified against one clipped,
+#      reprojected, tiled DEM opposed to the whole source DEM. Bounds without
+#      an AOI are snapped outward to DEM_TILE degrees, so neighbouring scenes
+#      share a DEM too.
+dem_cache_dir = Path(os.getenv("DEM_CACHE_DIR", base_dir.parent / "data" / "dem_cache"))
+DEM_TILE = 0.25
+
+def prepare_dem(input_dem: str, bounds: tuple, epsg: int, aoi=None,
+    buffer: float = 0.05, resolution: float = None
+    ) -> str:
+    """
+    Clips a DEM to an AOI's bounds, reprojects it to the scenes' UTM zone, and
+    writes it as a tiled GeoTIFF once, returning the cached DEM thereafter.
+
+    INPUT DEM - The source DEM (any GDAL readable raster)
+    BOUNDS - AOI bounds as (min lon, min lat, max lon, max lat)
+    EPSG - UTM EPSG code the scenes are orthorectified to
+    AOI - AOI identifier used in the cache key (Default: the bounds)
+    BUFFER - Degrees added around the bounds so scene edges are covered
+    RESOLUTION - Output DEM resolution in meters (Default: the source DEM's)
+    """
+    if aoi is None:
+        bounds = (math.floor(bounds[0] / DEM_TILE) * DEM_TILE, math.floor(bounds[1] / DEM_TILE) * DEM_TILE,
+                  math.ceil(bounds[2] / DEM_TILE) * DEM_TILE, math.ceil(bounds[3] / DEM_TILE) * DEM_TILE)
+    aoi_name = aoi if aoi is not None else '_'.join(f"{b:.2f}" for b in bounds)
+    dem = str(dem_cache_dir / f"dem_{aoi_name}_{epsg}.tif")
+
+    if not os.path.exists(dem):
+        dem_cache_dir.mkdir(parents=True, exist_ok=True)
+        min_x, min_y, max_x, max_y = bounds
+        print(f"Preparing DEM {dem} from {input_dem}")
+
+        # Floating point predictor only applies to floating point DEMs
+        src = gdal.Open(input_dem, gdal.GA_ReadOnly)
+        floating = gdal.DataTypeIsFloating(src.GetRasterBand(1).DataType)
+        src = None
+
+        # Written aside and renamed, so concurrent jobs never read a partial DEM
+        tmp = f"{dem}.{os.getpid()}.part"
+        gdal.Warp(tmp, input_dem,
+                  format='GTiff',
+                  dstSRS=f"EPSG:{epsg}",
+                  outputBounds=(min_x - buffer, min_y - buffer, max_x + buffer, max_y + buffer),
+                  outputBoundsSRS='EPSG:4326',
+                  xRes=resolution, yRes=resolution,
+                  resampleAlg='bilinear',
+                  multithread=True,
+                  creationOptions=['TILED=YES', 'BLOCKXSIZE=256', 'BLOCKYSIZE=256',
+                                   'COMPRESS=DEFLATE', f"PREDICTOR={3 if floating else 2}", 'BIGTIFF=IF_SAFER'])
+        os.replace(tmp, dem)
+
+    return dem
+
 
 # ----------------------------
 # Functions to be pulled from utils.py
 # ----------------------------
-def run_orthorectification(input_dem: str, output_dir: str, other_args: list = None):
+def run_orthorectification(input_dem: str, src: str, output_dir: str, other_args: list = None,
+    bounds: tuple = None, epsg: int = None, aoi=None
+    ):
     """
     Wrapper for PGC's pgc_ortho.py to orthorectify imagery with your parameters.
+    When BOUNDS and EPSG are provided the DEM is swapped for the cached, AOI
+    specific DEM from PREPARE DEM.
     """
     if other_args is None:
         other_args = []
 
+    if bounds is not None and epsg is not None:
+        input_dem = prepare_dem(input_dem, bounds, epsg, aoi=aoi)
+        other_args = ['-p', str(epsg), *other_args]
+
     # Mimic CLI call to pgc_ortho
     args = [
         "pgc_ortho.py",
         "--dem", input_dem,
-        "--outdir", output_dir,
         *other_args,
+        src,
+        output_dir,
     ]
 
+    # Imported here so the DEM cache is usable without PGC's repository on the path
+    import pgc_ortho
+
     print(f"Running pgc_ortho with: {' '.join(args)}")
-    pgc_ortho.main(args)  # Use pgc_ortho's main function directly if callable
+    argv = sys.argv
+    sys.argv = args
+    try:
+        pgc_ortho.main()
+    finally:
+        sys.argv = argv
+
+
+def run_orthorectification_batch(input_dem: str, scenes: list, output_dir: str,
+    bounds: tuple, epsg: int, aoi=None, other_args: list = None
+    ):
+    """
+    Orthorectifies every scene over an AOI in-process, preparing the AOI's DEM
+    once and reusing it for each scene.
+    """
+    dem = prepare_dem(input_dem, bounds, epsg, aoi=aoi)
+    for scene in scenes:
+        run_orthorectification(dem, scene, output_dir, ['-p', str(epsg), *(other_args or [])])
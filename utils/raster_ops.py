@@ -0,0 +1,362 @@
+# ------------------------------------------------------------------------------
+# ----- raster_ops.py ----------------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+#    authors:  GAIA contributors
+#
+#    purpose:  Contains reusable in-process raster methods for pansharpening,
+#              Cloud Optimized GeoTIFF (COG) creation, and coverage masking
+#
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Import libraries
+# ------------------------------------------------------------------------------
+import os
+import math
+import random
+from time import time
+import numpy as np
+from osgeo import gdal
+from osgeo_utils.gdal_pansharpen import gdal_pansharpen
+
+gdal.UseExceptions()
+
+
+# ------------------------------------------------------------------------------
+# Defaults
+# ------------------------------------------------------------------------------
+# Mirrors `rio cogeo create --zoom-level 20 --overview-resampling cubic -w`,
+#      the web-optimized COG previously built by the processing page.
+COG_CREATION_OPTIONS = {
+    'BLOCKSIZE': 512,
+    'COMPRESS': 'DEFLATE',
+    'OVERVIEW_RESAMPLING': 'CUBIC',
+    'NUM_THREADS': 'ALL_CPUS',
+    'BIGTIFF': 'IF_SAFER',
+    'TILING_SCHEME': 'GoogleMapsCompatible',
+    'ZOOM_LEVEL': 20,
+    'WARP_RESAMPLING': 'CUBIC',
+}
+
+# Half the width of the Web Mercator (EPSG:3857) world, in meters
+WEB_MERCATOR_EXTENT = 20037508.342789244
+
+# Tunable profiles for annotation tile delivery. Each profile overrides the
+#      COG CREATION OPTIONS above and can be further overridden per call
+#      (e.g., BLOCKSIZE, OVERVIEW_COUNT, PREDICTOR).
+COG_PROFILES = {
+    'deflate': {'COMPRESS': 'DEFLATE'},
+    'deflate_predictor': {'COMPRESS': 'DEFLATE', 'PREDICTOR': 'YES'},
+    'zstd': {'COMPRESS': 'ZSTD', 'LEVEL': 9, 'PREDICTOR': 'YES'},
+    'jpeg': {'COMPRESS': 'JPEG', 'QUALITY': 90},
+    'webp': {'COMPRESS': 'WEBP', 'QUALITY': 90},
+    'webp_lossless': {'COMPRESS': 'WEBP', 'QUALITY': 100},
+    'lerc': {'COMPRESS': 'LERC_ZSTD', 'MAX_Z_ERROR': 0},
+}
+
+
+# ------------------------------------------------------------------------------
+# Raster methods
+# ------------------------------------------------------------------------------
+def estimate_cog_bytes(pan_image: str, bands: int = 3, overviews: float = 4 / 3,
+    **creation_options
+    ) -> int:
+    """ Estimates the upper bound, in bytes, of an uncompressed COG pansharpened
+            from a panchromatic image, including its overviews. Used to reserve
+            local disk before the COG is written.
+
+        The size is that of the COG's output grid, not the panchromatic
+            image's: with a TILING SCHEME the image is warped to Web Mercator
+            at the resolution of its ZOOM LEVEL (chosen from the image's
+            resolution when not set) and padded to whole blocks.
+
+        PAN IMAGE - Calibrated panchromatic GeoTIFF
+        BANDS - Bands in the pansharpened output (Default: 3)
+        OVERVIEWS - Size factor for overviews (Default: 4/3, a full pyramid)
+        CREATION OPTIONS - Those passed to WRITE COG, over COG CREATION OPTIONS
+    """
+    options = {**COG_CREATION_OPTIONS, **creation_options}
+    ds = gdal.Open(pan_image, gdal.GA_ReadOnly)
+    pixel_bytes = gdal.GetDataTypeSize(ds.GetRasterBand(1).DataType) // 8
+    width, height = ds.RasterXSize, ds.RasterYSize
+
+    if options.get('TILING_SCHEME') == 'GoogleMapsCompatible':
+        # The warped grid is only planned in a VRT; no pixels are read
+        warped = gdal.Warp('', ds, format='VRT', dstSRS='EPSG:3857')
+        xmin, res, _, ymax, _, _ = warped.GetGeoTransform()
+        xmax, ymin = xmin + warped.RasterXSize * res, ymax - warped.RasterYSize * res
+        warped = None
+
+        # GDAL scales the tiling scheme's resolutions to BLOCKSIZE, so zoom
+        #      level 0 is the world in a single block
+        block = int(options.get('BLOCKSIZE', 512))
+        world_res = 2 * WEB_MERCATOR_EXTENT / block
+        zoom = (int(options['ZOOM_LEVEL']) if options.get('ZOOM_LEVEL') is not None
+                else max(math.ceil(math.log2(world_res / res)), 0))
+        tile = world_res / 2 ** zoom * block
+
+        tiles_x = math.floor((xmax + WEB_MERCATOR_EXTENT) / tile) - math.floor((xmin + WEB_MERCATOR_EXTENT) / tile) + 1
+        tiles_y = math.floor((WEB_MERCATOR_EXTENT - ymin) / tile) - math.floor((WEB_MERCATOR_EXTENT - ymax) / tile) + 1
+        width, height = tiles_x * block, tiles_y * block
+    ds = None
+
+    return int(width * height * bands * pixel_bytes * overviews)
+
+
+def pansharpen_to_vrt(pan_image: str, msi_image: str, vrt: str,
+    bands: tuple = (5, 3, 2), resampling: str = 'cubic'
+    ) -> str:
+    """ Pansharpens a calibrated panchromatic and multispectral pair into a
+            Virtual Format (VRT) file. No pixels are written; they are
+            computed on-the-fly by whichever process reads the VRT.
+
+        PAN IMAGE - Calibrated panchromatic GeoTIFF
+        MSI IMAGE - Calibrated multispectral GeoTIFF
+        VRT - Output VRT file
+        BANDS - Multispectral bands, in output order (Default: 5, 3, 2 or RGB)
+        RESAMPLING - Resampling of the multispectral bands (Default: cubic)
+    """
+    band_args = [arg for band in bands for arg in ('-b', str(band))]
+    gdal_pansharpen(['', '-of', 'VRT', *band_args, '-r', resampling,
+                     '-threads', 'ALL_CPUS', pan_image, msi_image, vrt])
+    return vrt
+
+
+def write_cog(src, cog: str, **creation_options) -> gdal.Dataset:
+    """ Writes a Cloud Optimized GeoTIFF with GDAL's COG driver, returning the
+            newly written COG as an open, read-only dataset.
+
+        SRC - A path to, or an open, GDAL dataset (e.g., a pansharpened VRT)
+        COG - Output COG file
+        CREATION OPTIONS - COG driver creation options (e.g., BLOCKSIZE,
+            COMPRESS, OVERVIEW_RESAMPLING, NUM_THREADS) overriding those
+            found in COG CREATION OPTIONS.
+
+        Ref: https://gdal.org/drivers/raster/cog.html
+    """
+    options = {**COG_CREATION_OPTIONS, **creation_options}
+    options = [f"{key}={value}" for key, value in options.items() if value is not None]
+
+    ds = gdal.Translate(cog, src, options=gdal.TranslateOptions(format='COG', creationOptions=options))
+    ds = None  # Flush to disk before re-opening
+    return gdal.Open(cog, gdal.GA_ReadOnly)
+
+
+def cog_profile(name: str = 'deflate', **overrides) -> dict:
+    """ Returns COG driver creation options for a named profile from
+            COG PROFILES with any overrides applied.
+
+        NAME - A key of COG PROFILES (Default: deflate, the original profile)
+        OVERRIDES - Creation options taking precedence over the profile
+            (e.g., BLOCKSIZE=256, OVERVIEW_COUNT=6, PREDICTOR='NO')
+    """
+    if name not in COG_PROFILES:
+        raise ValueError(f"Unknown COG profile {name}. Choose from: {', '.join(COG_PROFILES)}")
+    return {**COG_PROFILES[name], **overrides}
+
+
+def simulate_range_reads(cog: str, viewport: tuple = (1024, 768), samples: int = 50,
+    level: int = 0, header_bytes: int = 16384, seed: int = 0
+    ) -> dict:
+    """ Simulates the HTTP range requests a COG viewer makes for randomly
+            placed viewports by looking up the byte offset and size of every
+            tile a viewport touches. Tiles adjacent on disk are coalesced into
+            a single request, as GDAL and geotiff.js do.
+
+        COG - A Cloud Optimized GeoTIFF
+        VIEWPORT - Viewport width and height in pixels
+        SAMPLES - Number of viewports to sample
+        LEVEL - Overview level to read from (Default: 0, full resolution)
+        HEADER BYTES - Bytes fetched up front for the header and IFDs
+        SEED - Random seed so profiles are compared against identical viewports
+
+        Returns the mean bytes and mean requests per viewport.
+    """
+    ds = gdal.Open(cog, gdal.GA_ReadOnly)
+    bands = [ds.GetRasterBand(i + 1) for i in range(ds.RasterCount)]
+    if level > 0:
+        bands = [band.GetOverview(level - 1) for band in bands]
+    if ds.GetMetadataItem('INTERLEAVE', 'IMAGE_STRUCTURE') != 'BAND':
+        bands = bands[:1]  # Pixel interleaved tiles hold every band
+
+    block_x, block_y = bands[0].GetBlockSize()
+    width, height = bands[0].XSize, bands[0].YSize
+    view_x, view_y = min(viewport[0], width), min(viewport[1], height)
+
+    rng = random.Random(seed)
+    total_bytes, total_requests = 0, 0
+    for _ in range(samples):
+        x0 = rng.randint(0, width - view_x)
+        y0 = rng.randint(0, height - view_y)
+
+        ranges = []
+        for band in bands:
+            for ty in range(y0 // block_y, (y0 + view_y - 1) // block_y + 1):
+                for tx in range(x0 // block_x, (x0 + view_x - 1) // block_x + 1):
+                    offset = int(band.GetMetadataItem(f'BLOCK_OFFSET_{tx}_{ty}', 'TIFF') or 0)
+                    size = int(band.GetMetadataItem(f'BLOCK_SIZE_{tx}_{ty}', 'TIFF') or 0)
+                    if size:
+                        ranges.append((offset, offset + size))
+
+        merged_end, requests = None, 0
+        for start, end in sorted(ranges):
+            if merged_end is None or start > merged_end:
+                requests += 1
+            merged_end = end if merged_end is None else max(merged_end, end)
+            total_bytes += end - start
+
+        total_bytes += header_bytes
+        total_requests += requests + 1
+
+    ds = None
+    return {
+        'bytes_per_viewport': total_bytes / samples,
+        'requests_per_viewport': total_requests / samples,
+        'block_size': (block_x, block_y),
+    }
+
+
+def build_cog(pan_image: str, msi_image: str, cog: str, consumers: list = None,
+    source_consumers: list = None, **creation_options
+    ):
+    """ Single in-process raster stage. Pansharpens a calibrated image pair
+            into a VRT, writes the COG directly from that VRT, then hands
+            the open COG dataset to each consumer (e.g., its upload) and the
+            open VRT to each source consumer (e.g., point generation).
+
+        The full resolution pansharpened GeoTIFF is never materialized. The
+            COG is warped to the web tiling scheme of its creation options,
+            so work needing the image's native grid (e.g., point areas in
+            squared meters, UTM coordinates) reads the VRT instead, which
+            computes the same pansharpened pixels on that grid.
+
+        PAN IMAGE - Calibrated panchromatic GeoTIFF
+        MSI IMAGE - Calibrated multispectral GeoTIFF
+        COG - Output COG file
+        CONSUMERS - Callables accepting the open COG dataset
+        SOURCE CONSUMERS - Callables accepting the open pansharpened VRT,
+            on the calibrated pair's native grid; the VRT is removed after
+        CREATION OPTIONS - Passed to WRITE COG
+
+        Returns the COG and a list of each consumer's, then each source
+            consumer's, result.
+    """
+    vrt = os.path.splitext(cog)[0] + '.vrt'
+
+    start = time()
+    pansharpen_to_vrt(pan_image, msi_image, vrt)
+    print(f"\n It took: {round(time() - start,2)} seconds to create a pansharpened VRT: {vrt} \n")
+
+    try:
+        start = time()
+        ds = write_cog(vrt, cog, **creation_options)
+        print(f"\n It took: {round(time() - start,2)} seconds to create your COG: {cog} \n")
+
+        results = [consumer(ds) for consumer in (consumers or [])]
+        ds = None
+
+        if source_consumers:
+            src = gdal.Open(vrt, gdal.GA_ReadOnly)
+            results += [consumer(src) for consumer in source_consumers]
+            src = None
+    finally:
+        if os.path.exists(vrt):
+            os.remove(vrt)
+
+    return cog, results
+
+
+# ------------------------------------------------------------------------------
+# Coverage masking
+# ------------------------------------------------------------------------------
+class CoverageMask:
+    """ A low resolution mask of a raster's valid (or water) pixels read from
+            its coarsest sufficient COG overview, so work over nodata, or
+            land, can be skipped before any full resolution pixel is read.
+
+        Any window, in full resolution pixels or map coordinates, is checked
+            in O(1) from an integral image of the mask. The mask is dilated
+            by one overview pixel so coarse sampling never drops coverage.
+
+        Rasters without a sufficient overview (e.g., a VRT) are read once
+            decimated to about TARGET SIZE instead, never at full resolution.
+
+        SRC - A path to, or an open, GDAL dataset
+        TARGET SIZE - The overview's minimum width and height in pixels
+        MODE - 'valid' keeps non-zero pixels; 'water' also requires blue to
+            exceed red, a simple water test for RGB (5, 3, 2) pansharpened
+            imagery that drops most land, but also turbid water.
+    """
+    def __init__(self, src, target_size: int = 1024, mode: str = 'valid'):
+        if mode not in ('valid', 'water'):
+            raise ValueError(f"Unknown mask mode {mode}. Choose from: valid, water")
+
+        ds = gdal.Open(src, gdal.GA_ReadOnly) if isinstance(src, str) else src
+        self.width, self.height = ds.RasterXSize, ds.RasterYSize
+        self.geotransform = ds.GetGeoTransform()
+
+        bands = [ds.GetRasterBand(i + 1) for i in range(ds.RasterCount)]
+        level = None
+        for i in range(bands[0].GetOverviewCount()):
+            overview = bands[0].GetOverview(i)
+            if min(overview.XSize, overview.YSize) >= target_size:
+                level = i  # Overviews go from finest to coarsest
+        if level is not None:
+            bands = [band.GetOverview(level) for band in bands]
+            data = np.stack([band.ReadAsArray() for band in bands])
+        else:
+            factor = max(min(self.width, self.height) // target_size, 1)
+            buf_xsize, buf_ysize = -(-self.width // factor), -(-self.height // factor)
+            data = np.stack([band.ReadAsArray(buf_xsize=buf_xsize, buf_ysize=buf_ysize) for band in bands])
+
+        mask = np.any(data > 0, axis=0)
+        if mode == 'water' and len(data) >= 3:
+            mask &= data[2].astype(np.int32) > data[0].astype(np.int32)
+
+        # Dilate by one pixel
+        padded = np.pad(mask, 1)
+        mask = np.zeros_like(mask)
+        for dy in range(3):
+            for dx in range(3):
+                mask |= padded[dy:dy + mask.shape[0], dx:dx + mask.shape[1]]
+
+        self.mask = mask
+        self.scale_x, self.scale_y = self.width / mask.shape[1], self.height / mask.shape[0]
+        self.integral = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int64)
+        np.cumsum(np.cumsum(mask, axis=0), axis=1, out=self.integral[1:, 1:])
+
+    @property
+    def coverage(self):
+        """ Fraction of the raster covered by the mask. """
+        return float(self.mask.mean())
+
+    def any_in_window(self, xoff: int, yoff: int, xsize: int, ysize: int) -> bool:
+        """ Whether a full resolution pixel window holds any masked pixel. """
+        return bool(self.count_in_windows(np.array([xoff]), np.array([yoff]),
+                                          np.array([xoff + xsize]), np.array([yoff + ysize]))[0])
+
+    def count_in_windows(self, x0, y0, x1, y1) -> np.ndarray:
+        """ Masked overview pixels within each of many full resolution pixel
+                windows, given as arrays of their edges.
+        """
+        rows, cols = self.mask.shape
+        c0 = np.clip(np.floor(np.asarray(x0) / self.scale_x), 0, cols).astype(int)
+        c1 = np.clip(np.ceil(np.asarray(x1) / self.scale_x), 0, cols).astype(int)
+        r0 = np.clip(np.floor(np.asarray(y0) / self.scale_y), 0, rows).astype(int)
+        r1 = np.clip(np.ceil(np.asarray(y1) / self.scale_y), 0, rows).astype(int)
+        ii = self.integral
+        return ii[r1, c1] - ii[r0, c1] - ii[r1, c0] + ii[r0, c0]
+
+    def any_in_bounds(self, minx, miny, maxx, maxy) -> np.ndarray:
+        """ Whether each of many boxes, in the raster's map coordinates (north
+                up), holds any masked pixel. Accepts scalars or arrays.
+        """
+        gt = self.geotransform
+        x0 = (np.asarray(minx) - gt[0]) / gt[1]
+        x1 = (np.asarray(maxx) - gt[0]) / gt[1]
+        y0 = (np.asarray(maxy) - gt[3]) / gt[5]
+        y1 = (np.asarray(miny) - gt[3]) / gt[5]
+        return self.count_in_windows(x0, y0, x1, y1) > 0
@@ -15,14 +15,19 @@
 # ------------------------------------------------------------------------------
 import os
 import math
-import tempfile
-import subprocess
+from functools import lru_cache
+import numpy as np
+import shapely
+import rasterio
+from rasterio import features
+from rasterio.enums import Resampling
 from pyproj import CRS
 from osgeo import gdal
-from shapely.geometry import box
+from shapely.geometry import box, shape as to_shape
 from shapely.ops import unary_union
 import pandas as pd
 import geopandas as gpd
+from utils.raster_ops import CoverageMask
 
 
 # ------------------------------------------------------------------------------
@@ -39,75 +44,192 @@ def create_hexagon(cx, cy, r):
     return gpd.GeoSeries([gpd.points_from_xy(*zip(*points)).unary_union.convex_hull])[0]
 
 
-def create_fishnet(cogs: list, cell_width: float = 600, cell_height: float = 400,
-    buffer_overlap: float = 0, shape: str = "rectangle"
+def rectangle_grid(bounds: tuple, cell_width: float, cell_height: float,
+    origin: tuple = None
+    ) -> np.ndarray:
+    """ Creates every rectangular cell covering BOUNDS, column by column from
+            the lower left corner, in one vectorized call.
+
+        BOUNDS - (xmin, ymin, xmax, ymax)
+        CELL WIDTH, CELL HEIGHT - Cell size in map units
+        ORIGIN - A corner (x, y) the grid's lines pass through, e.g. a COG's
+                 upper left corner, so cell edges fall on its tile edges.
+                 Without it the grid starts at BOUNDS' lower left corner.
+
+        Returns an array of shapely polygons.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    if origin is not None:
+        # Move the lower left corner down onto the nearest grid line
+        xmin = origin[0] + math.floor((xmin - origin[0]) / cell_width) * cell_width
+        ymin = origin[1] + math.floor((ymin - origin[1]) / cell_height) * cell_height
+    xs = xmin + np.arange(math.ceil((xmax - xmin) / cell_width)) * cell_width
+    ys = ymin + np.arange(math.ceil((ymax - ymin) / cell_height)) * cell_height
+    x, y = np.meshgrid(xs, ys, indexing='ij')
+    x, y = x.ravel(), y.ravel()
+    return shapely.box(x, y, x + cell_width, y + cell_height)
+
+
+def hexagon_grid(bounds: tuple, cell_width: float) -> np.ndarray:
+    """ Creates every flat-top hexagon covering BOUNDS in one vectorized call.
+            Columns are spaced three quarters of a hexagon's width apart
+            and every odd column is offset by half a hexagon's height, so
+            the hexagons tile without gaps or overlaps.
+
+        BOUNDS - (xmin, ymin, xmax, ymax)
+        CELL WIDTH - Hexagon width, vertex to vertex, in map units
+
+        Returns an array of shapely polygons, column by column.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    r = cell_width / 2
+    dx = cell_width * 3/4
+    dy = math.sqrt(3) * r
+
+    columns = np.arange(math.ceil((xmax + cell_width - xmin) / dx))
+    rows = np.arange(math.ceil((ymax + dy - ymin) / dy) + 1)
+    col, row = np.meshgrid(columns, rows, indexing='ij')
+    cx = xmin + col * dx
+    cy = ymin - (col % 2) * dy / 2 + row * dy
+    cx, cy = cx.ravel(), cy.ravel()
+
+    angles = np.radians(np.arange(0, 420, 60))  # Six vertices, closed
+    coords = np.stack([cx[:, None] + r * np.cos(angles), cy[:, None] + r * np.sin(angles)], axis=-1)
+    return shapely.polygons(coords)
+
+
+def image_footprint(cog: str, target_size: int = 1024):
+    """ Extracts the footprint of a COG's valid (non-zero) pixels in-process,
+            polygonizing the valid data mask of a decimated read, which
+            rasterio serves from the COG's overviews.
+
+        Footprints are cached per COG, and re-computed when the COG changes.
+
+        COG - A Cloud Optimized GeoTIFF
+        TARGET SIZE - The decimated read's minimum width and height in pixels
+
+        Returns the footprint, in the COG's CRS, and that CRS.
+    """
+    stat = os.stat(cog)
+    return _image_footprint(os.path.abspath(cog), stat.st_mtime, stat.st_size, target_size)
+
+
+@lru_cache(maxsize=64)
+def _image_footprint(cog, mtime, size, target_size):
+    with rasterio.open(cog) as src:
+        factor = max(min(src.width, src.height) // target_size, 1)
+        height, width = max(src.height // factor, 1), max(src.width // factor, 1)
+        data = src.read(out_shape=(src.count, height, width), resampling=Resampling.nearest)
+        transform = src.transform * src.transform.scale(src.width / width, src.height / height)
+        crs = src.crs
+
+    valid = np.any(data > 0, axis=0)
+    polygons = [to_shape(geometry) for geometry, value in
+                features.shapes(valid.astype(np.uint8), mask=valid, transform=transform)]
+    return unary_union(polygons), crs
+
+
+def cell_size_from_gsd(gsd_x: float, gsd_y: float, viewport: tuple = (1024, 768),
+    block_size: tuple = (512, 512)
+    ) -> tuple:
+    """
+    Sizes fishnet cells so each one spans the whole COG tiles that fit in an
+    annotator's viewport at full resolution, so reviewing a cell needs a
+    predictable number of tile requests and no zooming or panning. Cells
+    only line up with tiles when their grid starts on the COG's tile grid
+    (see RECTANGLE GRID's ORIGIN, as FISHNET CELLS uses it).
+
+    The viewport is floored to whole tiles, but never below one: the default
+    1024 x 768 viewport over 512 pixel tiles gives 1024 x 512 pixel cells.
+
+    GSD X, GSD Y - Ground sample distance, per pixel, in map units
+    VIEWPORT - On-screen pixel budget as width and height
+    BLOCK SIZE - The COG's tile width and height in pixels
+
+    Returns the cell width and height in map units.
+    """
+    tiles_x = max(viewport[0] // block_size[0], 1)
+    tiles_y = max(viewport[1] // block_size[1], 1)
+    return tiles_x * block_size[0] * abs(gsd_x), tiles_y * block_size[1] * abs(gsd_y)
+
+
+def fishnet_cells(cog: str, cell_width: float = 600, cell_height: float = 400,
+    buffer_overlap: float = 0, shape: str = "rectangle", mask: str = "valid",
+    viewport: tuple = None
     ):
-    """ 
-    
+    """
+    Creates the fishnet cells over one COG's footprint. See CREATE FISHNET.
+    Hexagons are sized by CELL WIDTH alone, so CELL HEIGHT only applies to
+    rectangles.
+
+    With VIEWPORT, cells are sized by CELL SIZE FROM GSD, replacing CELL WIDTH
+    and CELL HEIGHT, using the COG's own pixel size from its geotransform,
+    the pixels annotators are actually served. Rectangles then start on the
+    COG's upper left corner, so each cell covers whole tiles; hexagons can't.
+
+    Returns an array of shapely polygons and their CRS.
     """
     assert shape in ["rectangle", "hex"]
 
-    tmp_dir = tempfile.mkdtemp()
+    print(f"\nCreating imagery footprint: {cog}\n")
+    footprint, crs = image_footprint(cog)
+    print(f"\nYour footprint is in {crs} CRS\n")
+
+    if not is_projected_in_meters(CRS.from_user_input(crs)):
+        raise ValueError("CRS units are not in meters." +
+                         "Fishnet creation assumes meter-based projection.")
+
+    origin = None
+    if viewport is not None:
+        ds = gdal.Open(cog, gdal.GA_ReadOnly)
+        block_size = ds.GetRasterBand(1).GetBlockSize()
+        gt = ds.GetGeoTransform()
+        ds = None
+        cell_width, cell_height = cell_size_from_gsd(gt[1], gt[5], viewport, block_size)
+        origin = (gt[0], gt[3])
+        print(f"\nYour cells are {round(cell_width, 1)} by {round(cell_height, 1)} map units\n")
+    
+    bbox = box(*footprint.bounds)
+    print(bbox)
+
+    coverage = CoverageMask(cog, mode=mask) if mask else None
 
+    if buffer_overlap > 0:
+        bbox = bbox.buffer(buffer_overlap)
+
+    if shape == "rectangle":
+        cells = rectangle_grid(bbox.bounds, cell_width, cell_height, origin)
+    elif shape == "hex":
+        cells = hexagon_grid(bbox.bounds, cell_width)
+
+    # Keep cells over the footprint, and its valid pixels, in vectorized calls
+    shapely.prepare(footprint)
+    keep = shapely.intersects(cells, footprint)
+    if coverage is not None:
+        xmin, ymin, xmax, ymax = shapely.bounds(cells).T
+        keep &= coverage.any_in_bounds(xmin, ymin, xmax, ymax)
+
+    return cells[keep], crs
+
+
+def create_fishnet(cogs: list, cell_width: float = 600, cell_height: float = 400,
+    buffer_overlap: float = 0, shape: str = "rectangle", mask: str = "valid",
+    viewport: tuple = None
+    ):
+    """ 
+    Creates a fishnet of rectangular or hexagonal cells over each COG's
+    footprint. With MASK, cells without 'valid' or 'water' pixels according
+    to a COG overview pre-pass (see CoverageMask) are never created. With
+    VIEWPORT, cells are sized from each COG's pixel size (see CELL SIZE FROM GSD).
+    """
     fishnet_gdfs = []
     for cog in cogs:
-        tmp_shp = os.path.join(tmp_dir, os.path.basename(cog).replace('.tif', '_fp.shp'))
-        print(f"\nCreating imagery footprint: {tmp_shp}\n")
-        subprocess.run(['gdal_footprint',
-                        '-srcnodata', '0',
-                        cog,
-                        tmp_shp], check=True)
-        
-        gdf = gpd.read_file(tmp_shp)
-        crs = gdf.crs
-        print(f"\nYour footprint is in {crs} CRS\n")
-
-        if not is_projected_in_meters(CRS.from_user_input(crs)):
-            raise ValueError("CRS units are not in meters." +
-                             "Fishnet creation assumes meter-based projection.")
-        
-        bbox = box(*gdf.geometry[0].bounds)
-        print(bbox)
-
-        if buffer_overlap > 0:
-            bbox = bbox.buffer(buffer_overlap)
-
-        grid = []
-        if shape == "rectangle":
-            xmin, ymin, xmax, ymax = bbox.bounds
-            x = xmin
-            while x < xmax:
-                y = ymin
-                while y < ymax:
-                    cell = box(x, y, x + cell_width, y + cell_height)
-                    if cell.intersects(gdf.geometry[0]):
-                        grid.append(cell)
-                    y += cell_height
-                x += cell_width
-        elif shape == "hex":
-            xmin, ymin, xmax, ymax = bbox.bounds
-            dx = cell_width * 3/4
-            dy = cell_height * math.sqrt(3)/2
-            row = 0
-            x = xmin
-            while x < xmax + cell_width:
-                y = ymin - (dy / 2 if row % 2 else 0)
-                while y < ymax + cell_height:
-                    cx = x
-                    cy = y
-                    hexagon = create_hexagon(cx, cy, cell_width / 2)
-                    if hexagon.intersects(gdf.geometry[0]):
-                        grid.append(hexagon)
-                    y += dy
-                x += dx
-                row += 1
-
+        grid, crs = fishnet_cells(cog, cell_width, cell_height, buffer_overlap, shape, mask, viewport)
         fishnet_gdf = gpd.GeoDataFrame(geometry=grid, crs=crs)
         fishnet_gdf['vendor_id'] = os.path.basename(cog.replace('.tif', ''))
         fishnet_gdfs.append(fishnet_gdf)
 
     pdf = pd.concat(fishnet_gdfs, ignore_index=True)
     gdf = gpd.GeoDataFrame(pdf, geometry='geometry', crs=crs)
-    gdf.to_file(os.path.join(tmp_dir, os.path.basename(cog).replace('.tif', '_fishnet.shp')))
 
-    return gdf
\ No newline at end of file
+    return gdf
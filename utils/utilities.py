@@ -1,10 +1,10 @@
 import sqlite3
 from datetime import datetime
 import shapely
-from shapely.geometry import box, Polygon
 import pandas as pd
 import geopandas as gpd
 import folium
+from utils.catalog import ee_gdf, gegd_gdf, mgp_gdf
 
 def quick_map(gdf_imagery, json_aoi):
     """ Creates a folium map to show imagery added to the database.
@@ -291,37 +291,8 @@ def gdf_from_gegd(results, dar_id):
         RESULTS - Results from querying Global Enhanced GEOINT Delivery API
         DAR ID - DAR ID number
     """
-    df = pd.DataFrame()
-    
-    for i, record in enumerate(results['features']):
-        df.loc[i, 'id'] = record['id']
-        df.loc[i, 'aoi_id'] = dar_id
-        df.loc[i, 'legacy_id'] = record['properties']['legacyId']
-        df.loc[i, 'factory_order_number'] = record['properties']['factoryOrderNumber']
-        df.loc[i, 'acquisition_date'] = record['properties']['acquisitionDate']
-        df.loc[i, 'source'] = record['properties']['source']
-        df.loc[i, 'source_unit'] = record['properties']['sourceUnit']
-        df.loc[i, 'product_type'] = record['properties']['productType']
-        df.loc[i, 'cloud_cover'] = record['properties']['cloudCover']
-        df.loc[i, 'off_nadir_angle'] = record['properties']['offNadirAngle']
-        df.loc[i, 'sun_elevation'] = record['properties']['sunElevation']
-        df.loc[i, 'sun_azimuth'] = record['properties']['sunAzimuth']
-        df.loc[i, 'ground_sample_distance'] = record['properties']['groundSampleDistance']
-        df.loc[i, 'data_layer'] = record['properties']['dataLayer']
-        df.loc[i, 'legacy_description'] = record['properties']['legacyDescription']
-        df.loc[i, 'color_band_order'] = record['properties']['colorBandOrder']
-        df.loc[i, 'asset_name'] = record['properties']['assetName']
-        df.loc[i, 'per_pixel_x'] = record['properties']['perPixelX']
-        df.loc[i, 'per_pixel_y'] = record['properties']['perPixelY']
-        df.loc[i, 'crs_from_pixels'] = record['properties']['crsFromPixels']
-        df.loc[i, 'age_days'] = record['properties']['ageDays']
-        df.loc[i, 'ingest_date'] = record['properties']['ingestDate']
-        df.loc[i, 'company_name'] = record['properties']['companyName']
-        df.loc[i, 'copyright'] = record['properties']['copyright']
-        df.loc[i, 'niirs'] = record['properties']['niirs']
-        df.loc[i, 'geometry'] = Polygon([list(reversed(point)) for point in record['geometry']['coordinates'][0]])
-    gdf = gpd.GeoDataFrame(df, geometry='geometry')
-    return gdf.set_crs(4326)
+    gdf = gegd_gdf(results['features'], dar_id)
+    return gdf[['id', 'aoi_id'] + [column for column in gdf.columns if column not in ('id', 'aoi_id')]]
 
 def gdf_from_mgp(results, dar_id):
     """ Creates a GeoDataFrame from Maxar Geospatial Platform results with columns
@@ -330,29 +301,7 @@ def gdf_from_mgp(results, dar_id):
         RESULTS - Results from querying the Maxar Geospatial Platform API
         DAR ID - DAR ID number
     """    
-    columns = ["id", "platform", "instruments", "gsd", "pan_resolution_avg",
-               "multi_resolution_avg", "datetime", "off_nadir", "azimuth",
-               "sun_azimuth", "sun_elevation", "bbox"]
-    gdf = gpd.GeoDataFrame(columns = columns)
-    gdf = gdf.set_geometry("bbox").set_crs("EPSG:4326")
-    
-    r = results.json()
-    for i, feature in enumerate(r["features"]):
-        gdf.loc[i, "id"] = feature["id"]
-        gdf.loc[i, "aoi_id"] = dar_id
-        gdf.loc[i, "platform"] = feature["properties"]["platform"]
-        gdf.loc[i, "instruments"] = ', '.join(feature["properties"]["instruments"])
-        gdf.loc[i, "gsd"] = feature["properties"]["gsd"]
-        gdf.loc[i, "pan_resolution_avg"] = feature["properties"]["pan_resolution_avg"]
-        gdf.loc[i, "multi_resolution_avg"] = feature["properties"]["multi_resolution_avg"]
-        gdf.loc[i, "datetime"] = feature["properties"]["datetime"]
-        gdf.loc[i, "off_nadir"] = feature["properties"]["view:off_nadir"]
-        gdf.loc[i, "azimuth"] = feature["properties"]["view:azimuth"]
-        gdf.loc[i, "sun_azimuth"] = feature["properties"]["view:sun_azimuth"]
-        gdf.loc[i, "sun_elevation"] = feature["properties"]["view:sun_elevation"]
-        gdf.loc[i, "bbox"] = box(*feature["bbox"])
-
-    return gdf
+    return mgp_gdf(results.json()["features"], dar_id, geometry="bbox")
 
 def gdf_from_ee(results, dar_id):
     """ Creates a GeoDataFrame from EarthExplorer results with columns
@@ -363,20 +312,7 @@ def gdf_from_ee(results, dar_id):
     """
     # Create a GeoDataFrame from query results
     r = results.json()
-    results_data = r['data']['results']
-    columns = [field['fieldName'] for field in results_data[0]['metadata']]
-    gdf = gpd.GeoDataFrame(columns = columns)
-    
-    for result in results_data:
-        gdf.loc[gdf.shape[0]] = [field['value'] for field in result['metadata']]
-    
-    gdf['thumbnail'] = pd.Series([result['browse'][0]['thumbnailPath'] for result in results_data])
-    gdf['publish_date'] = pd.Series([result['publishDate'] for result in results_data])
-    gdf['bounds'] = gpd.GeoSeries([Polygon(result['spatialBounds']['coordinates'][0]) for result in results_data])
-    gdf = gdf.set_geometry("bounds").set_crs("EPSG:4326")
-    
-    drop_columns = [column for column in columns if "Corner" in column] + ['Center Latitude', 'Center Longitude']
-    gdf = gdf.drop(drop_columns, axis=1)
+    gdf = ee_gdf(r['data']['results'], dar_id).drop(columns='aoi')
 
     # Update column names to database-safe version
     column_list = list(gdf.columns)